@@ -1,11 +1,16 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query
 from datetime import datetime
 from enum import Enum
-import json
-import os
+import time
 from typing import Optional, List, Union
 from pydantic import BaseModel
 
+from feedback_store import FeedbackAggregates, FeedbackStore
+from metrics import counter, histogram
+
+FEEDBACK_SECONDS = histogram('feedback_request_seconds', 'Time to accept a feedback entry', ['status'])
+FEEDBACK_ENTRIES = counter('feedback_entries_total', 'Feedback entries received', ['tab_type', 'is_positive'])
+
 
 class TabType(str, Enum):
     RCA = "rca"
@@ -28,8 +33,18 @@ class FeedbackRequest(BaseModel):
     user_id: str
 
 
+feedback_store = FeedbackStore()
+feedback_aggregates = FeedbackAggregates.from_log(feedback_store.path)
+
+
+@app.on_event("shutdown")
+def close_feedback_store():
+    feedback_store.close()
+
+
 @app.post("/feedback")
 async def save_feedback(feedback: FeedbackRequest):
+    start = time.perf_counter()
     try:
         feedback_entry = {
             "tab_type": feedback.tab_type,
@@ -42,26 +57,11 @@ async def save_feedback(feedback: FeedbackRequest):
         if feedback.text_feedback and feedback.text_feedback.strip():
             feedback_entry["text_feedback"] = feedback.text_feedback
 
-        filename = "all_feedback.json"
-
-        # Create file with empty list if it doesn't exist
-        if not os.path.exists(filename):
-            with open(filename, 'w') as f:
-                json.dump([], f)
-
-        # Read existing feedback
-        with open(filename, 'r') as f:
-            try:
-                all_feedback = json.load(f)
-            except json.JSONDecodeError:
-                all_feedback = []
-
-        # Add new feedback
-        all_feedback.append(feedback_entry)
-
-        # Save all feedback back to file
-        with open(filename, 'w') as f:
-            json.dump(all_feedback, f, indent=2)
+        # Queued for the background writer, the handler never waits on file I/O
+        feedback_store.append(feedback_entry)
+        feedback_aggregates.record(feedback_entry)
+        FEEDBACK_ENTRIES.inc(tab_type=feedback.tab_type.value, is_positive=feedback.is_positive)
+        FEEDBACK_SECONDS.observe(time.perf_counter() - start, status='success')
 
         return {
             "status": "success",
@@ -69,6 +69,7 @@ async def save_feedback(feedback: FeedbackRequest):
         }
 
     except Exception as e:
+        FEEDBACK_SECONDS.observe(time.perf_counter() - start, status='error')
         return {
             "status": "error",
             "message": str(e),
@@ -76,6 +77,25 @@ async def save_feedback(feedback: FeedbackRequest):
         }
 
 
+@app.get("/feedback/stats")
+async def feedback_stats(
+    group_by: str = Query(default="tab_type", description="tab_type, user, day or hour"),
+    key: Optional[str] = Query(default=None, description="Return only this bucket, e.g. a user id or 2024-01-31")
+):
+    if group_by not in FeedbackAggregates.GROUPS:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by. Must be one of: {', '.join(FeedbackAggregates.GROUPS)}")
+    return feedback_aggregates.stats(group_by, key)
+
+
+@app.get("/feedback/text")
+async def feedback_text(
+    page: int = Query(default=1, description="Page number, newest first", ge=1),
+    limit: int = Query(default=50, description="Entries per page", ge=1, le=500),
+    tab_type: Optional[TabType] = Query(default=None, description="Only feedback for this tab")
+):
+    return feedback_aggregates.text_feedback(page, limit, tab_type.value if tab_type else None)
+
+
 """
 Example feedback data format in JSON:
 
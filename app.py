@@ -1,20 +1,189 @@
 import pandas as pd
+import numpy as np
 import psycopg2
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 import time
 from tqdm import tqdm
 import psutil
 import os
-from datetime import datetime, timedelta
+import random
+from datetime import datetime, timedelta, timezone
 import gc
+import shutil
+import tempfile
 import threading
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from metrics import counter, gauge, histogram
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather
+    STRING_DTYPE = 'string[pyarrow]'
+    HAS_PYARROW = True
+except ImportError:
+    STRING_DTYPE = 'object'
+    HAS_PYARROW = False
+
+
+TIMESTAMP_COLUMNS = {
+    'dc1.events': 'created_ts',
+    'dc1sm_ro.incidents': 'update_time',
+    'dc1sm_ro.rfc': 'update_time',
+    'dc1sm_ro.problems': 'update_time',
+    'dc1sm_ro.problem_tasks': 'update_time',
+    'itsm_owner.cis': 'pfz_added_time'
+}
+
+# Incremental fetches start this far before each table's watermark to catch late-committed rows
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Primary key of each table, used to merge incremental fetches into the loaded frames
+TABLE_PRIMARY_KEYS = {
+    'dc1.events': 'event_id',
+    'dc1sm_ro.incidents': 'numberprgn',
+    'dc1sm_ro.rfc': 'numberprgn',
+    'dc1sm_ro.problems': 'id',
+    'dc1sm_ro.problem_tasks': 'id',
+    'itsm_owner.cis': 'logical_name'
+}
+
+# Extraction engine per table: 'cursor' (server-side cursor + fetchmany) or 'copy' (COPY ... TO STDOUT)
+TABLE_FETCH_ENGINES = {
+    'dc1.events': 'copy',
+    'itsm_owner.cis': 'copy'
+}
+
+# How the progress total is sized per table: 'exact' (COUNT(*)), 'estimate' (planner estimate) or 'none'
+TABLE_COUNT_MODES = {
+    'dc1.events': 'estimate',
+    'itsm_owner.cis': 'estimate'
+}
+
+# Postgres data types that COPY parsing leaves to pandas inference instead of reading as text
+NUMERIC_PG_TYPES = {'smallint', 'integer', 'bigint', 'numeric', 'real', 'double precision', 'boolean'}
+DATETIME_PG_TYPES = {'timestamp without time zone', 'timestamp with time zone', 'date'}
+
+# Process RSS growth in MB allowed while loading a table; past it, finished chunks are spilled to disk
+TABLE_MEMORY_BUDGETS_MB = {
+    'dc1.events': 8192
+}
+
+# Target pandas dtype for each Postgres type; nullable integers keep every chunk on the same dtype
+PG_DTYPES = {
+    'smallint': 'Int16',
+    'integer': 'Int32',
+    'bigint': 'Int64',
+    'real': 'float32',
+    'double precision': 'float32',
+    'numeric': 'float64',
+    'boolean': 'boolean',
+    'timestamp without time zone': 'datetime64[ns]',
+    'timestamp with time zone': 'datetime64[ns, UTC]',
+    'date': 'datetime64[ns]'
+}
+TEXT_PG_TYPES = {'text', 'character varying', 'character'}
+
+# Text columns stored as category: these names always, others when pg_stats reports few distinct values
+CATEGORY_COLUMNS = {'status', 'priority', 'severity', 'location'}
+CATEGORY_MAX_DISTINCT = 1000
+
+# Rows matching (column, values) are deleted upstream and get dropped on merge
+TABLE_TOMBSTONES = {
+    'itsm_owner.cis': ('istatus', ('Retired', 'Disposed'))
+}
+
+# Refresh interval bounds per table in seconds as (min, initial, max); others use the loader's interval_minutes
+TABLE_REFRESH_INTERVALS = {
+    'dc1.events': (60, 300, 900),
+    'dc1sm_ro.incidents': (60, 300, 900),
+    'dc1sm_ro.rfc': (300, 900, 3600),
+    'dc1sm_ro.problems': (300, 900, 3600),
+    'dc1sm_ro.problem_tasks': (300, 900, 3600),
+    'itsm_owner.cis': (1800, 3600, 4 * 3600)
+}
+
+# A delta this large halves a table's interval, an empty one stretches it by REFRESH_BACKOFF
+REFRESH_BUSY_ROWS = 10000
+REFRESH_BACKOFF = 1.5
+# Interval is kept at least this many times the table's last refresh cost
+REFRESH_COST_FACTOR = 10
+# Each wait is randomized by +/- this fraction so tables don't hit the database in lockstep
+REFRESH_JITTER = 0.1
+# Local hours of peak database load (e.g. {1, 2} for nightly batch jobs); intervals are stretched by DB_PEAK_FACTOR
+DB_PEAK_HOURS = set()
+DB_PEAK_FACTOR = 2.0
+
+# Minimum seconds between snapshot saves; tables changed in between are written by the next one
+SNAPSHOT_SAVE_INTERVAL = 600
+
+# Retention per table as (time window, max rows) on its TIMESTAMP_COLUMNS column; either may be None.
+# Rows older than the window, or beyond the newest max rows, are evicted on refresh (see RETENTION_SLACK).
+TABLE_RETENTION = {
+    'dc1.events': (timedelta(days=30), 5000000),
+    'dc1sm_ro.incidents': (timedelta(days=7), 200000),
+    'dc1sm_ro.rfc': (timedelta(days=180), None),
+    'dc1sm_ro.problems': (timedelta(days=365), None),
+    'dc1sm_ro.problem_tasks': (timedelta(days=365), None)
+}
+
+# Column whose newest values a table's retention max_rows keeps, when not its TIMESTAMP_COLUMNS column
+TABLE_ROW_LIMIT_ORDER = {
+    'dc1sm_ro.incidents': 'open_time'
+}
+
+# Expired rows are only evicted once they exceed this fraction of the table, so a sliding
+# window doesn't rebuild the table and its indexes on every refresh
+RETENTION_SLACK = 0.05
+
+
+def frame_column(table_name: str, column: str) -> str:
+    """Return the column name as it appears in the loaded DataFrame for this table"""
+    return column.lower() if 'events' in table_name else column.upper()
+
+
+def to_utc(value: datetime) -> datetime:
+    """value as an aware UTC datetime; naive values are local time, as in timestamp without time zone columns"""
+    return value.astimezone(timezone.utc)
+
+
+def timestamp_literal(value: datetime, pg_type: Optional[str]) -> str:
+    """SQL literal for comparing value with a column of pg_type: UTC with offset, or naive local time"""
+    if pg_type == 'timestamp with time zone':
+        return to_utc(value).isoformat(sep=' ', timespec='seconds')
+    return to_utc(value).astimezone().replace(tzinfo=None).isoformat(sep=' ', timespec='seconds')
+
+
+# Loader metrics, served on /metrics by gr.py
+LOADER_STAGE_SECONDS = histogram('loader_stage_seconds', 'Seconds spent in each load stage per table', ['table', 'stage'])
+LOADER_REFRESH_SECONDS = histogram('loader_refresh_seconds', 'Duration of a full refresh cycle')
+LOADER_REFRESHES = counter('loader_refreshes_total', 'Refresh cycles by outcome', ['outcome'])
+LOADER_TABLE_ERRORS = counter('loader_table_errors_total', 'Failed table fetches', ['table'])
+LOADER_ROWS_FETCHED = counter('loader_rows_fetched_total', 'Rows fetched from Postgres', ['table'])
+LOADER_BYTES_FETCHED = counter('loader_bytes_fetched_total', 'In-memory bytes of fetched chunks (shallow)', ['table'])
+LOADER_ROWS_EVICTED = counter('loader_rows_evicted_total', 'Rows evicted by retention', ['table'])
+TABLE_ROWS = gauge('loader_table_rows', 'Rows in the published frame', ['table'])
+TABLE_BYTES = gauge('loader_table_bytes', 'In-memory bytes of the published frame (shallow)', ['table'])
+TABLE_LAG_SECONDS = gauge('loader_table_lag_seconds', 'Seconds between now and the table watermark', ['table'])
+TABLE_LOAD_PEAK_MB = gauge('loader_table_load_peak_memory_mb', 'Peak process RSS during the last load of the table', ['table'])
+TABLE_REFRESH_INTERVAL = gauge('loader_table_refresh_interval_seconds', 'Current adaptive refresh interval', ['table'])
+SNAPSHOT_GENERATION = gauge('loader_snapshot_generation', 'Generation of the published snapshot')
+PROCESS_MEMORY_MB = gauge('process_memory_mb', 'Process RSS at the last measurement')
+PROCESS_MEMORY_PEAK_MB = gauge('process_memory_peak_mb', 'Highest process RSS measured')
 
 
 def get_memory_usage():
     """Get current memory usage of the process"""
     process = psutil.Process(os.getpid())
-    return process.memory_info().rss / 1024 / 1024
+    memory = process.memory_info().rss / 1024 / 1024
+    PROCESS_MEMORY_MB.set(memory)
+    PROCESS_MEMORY_PEAK_MB.set_max(memory)
+    return memory
 
 
 def get_postgres_secrets():
@@ -32,12 +201,17 @@ def get_postgres_secrets():
     return json.dumps(secrets)
 
 
+@lru_cache(maxsize=1)
+def _postgres_params() -> Dict:
+    """Parsed database credentials, cached until a reconnect clears them"""
+    return json.loads(get_postgres_secrets())
+
+
 def connect_to_postgres(db_params: Dict) -> psycopg2.extensions.connection:
-    """Establish connection to PostgreSQL database"""
-    result = get_postgres_secrets()
+    """Establish connection to PostgreSQL database, db_params overrides the stored secrets"""
     result_dict = {}
-    res = json.loads(result)
-    result_dict.update(res)
+    result_dict.update(_postgres_params())
+    result_dict.update(db_params or {})
     
     try:
         postgres_conn = psycopg2.connect(
@@ -53,135 +227,978 @@ def connect_to_postgres(db_params: Dict) -> psycopg2.extensions.connection:
         raise
 
 
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of connections created with connect_to_postgres.
+
+    Holds at least min_size idle connections and hands out at most max_size at once.
+    Connections idle for longer than health_check_seconds are tested with SELECT 1
+    before reuse; broken ones are replaced. New connections are retried with
+    exponential backoff so a short database outage delays a refresh instead of failing it.
+    """
+    def __init__(self, min_size=1, max_size=6, health_check_seconds=60, max_retries=5,
+                 backoff_seconds=1.0, max_backoff_seconds=30.0):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.health_check_seconds = health_check_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._idle = []  # (connection, last_used) pairs
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self) -> psycopg2.extensions.connection:
+        """Open a new connection, retrying with exponential backoff"""
+        delay = self.backoff_seconds
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return connect_to_postgres({})
+            except psycopg2.OperationalError as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Connection attempt {attempt} failed, retrying in {delay:.1f}s: {e}")
+                _postgres_params.cache_clear()  # Pick up rotated credentials
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff_seconds)
+
+    def _is_healthy(self, conn: psycopg2.extensions.connection, last_used: float) -> bool:
+        """Check a pooled connection before handing it out"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: psycopg2.extensions.connection):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout: float = None) -> psycopg2.extensions.connection:
+        """Take a connection from the pool, waiting up to timeout seconds if all are in use"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            while not self._idle and self._in_use >= self.max_size:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError(f"No database connection available within {timeout}s")
+            item = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if item and self._is_healthy(*item):
+                return item[0]
+            if item:
+                self._close_quietly(item[0])
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn: psycopg2.extensions.connection, discard: bool = False):
+        """Return a connection to the pool, closing it if discard is set or it is broken"""
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()  # End any open transaction and release its snapshot
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Context manager that checks a connection out and back in, discarding it on connection errors"""
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard)
+
+    def closeall(self):
+        """Close all idle connections; checked out ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_connection_pool(min_size=1, max_size=6) -> PostgresConnectionPool:
+    """Return the process-wide connection pool, creating it on first use"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = PostgresConnectionPool(min_size=min_size, max_size=max_size)
+        return _shared_pool
+
+
 def optimize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """Optimize memory usage of DataFrame by downcasting numeric types"""
     for col in df.columns:
         if df[col].dtype == 'int64':
-            if df[col].min() >= 0:
-                if df[col].max() < 255:
+            col_min, col_max = df[col].min(), df[col].max()
+            if col_min >= 0:
+                if col_max < 255:
                     df[col] = df[col].astype('uint8')
-                elif df[col].max() < 65535:
+                elif col_max < 65535:
                     df[col] = df[col].astype('uint16')
-                elif df[col].max() < 4294967295:
+                elif col_max < 4294967295:
                     df[col] = df[col].astype('uint32')
             else:
-                if df[col].min() > -128 and df[col].max() < 127:
+                if col_min > -128 and col_max < 127:
                     df[col] = df[col].astype('int8')
-                elif df[col].min() > -32768 and df[col].max() < 32767:
+                elif col_min > -32768 and col_max < 32767:
                     df[col] = df[col].astype('int16')
-                elif df[col].min() > -2147483648 and df[col].max() < 2147483647:
+                elif col_min > -2147483648 and col_max < 2147483647:
                     df[col] = df[col].astype('int32')
         elif df[col].dtype == 'float64':
             df[col] = df[col].astype('float32')
     return df
 
 
-def fetch_table_data(table_name: str, conn: psycopg2.extensions.connection, last_update: datetime = None) -> pd.DataFrame:
-    """Fetch data from specified table with optional incremental loading"""
+def plan_dtypes(column_types: Dict[str, str], n_distinct: Dict[str, float] = None) -> Dict[str, str]:
+    """
+    Choose the pandas dtype of each column from its Postgres type before any rows are fetched.
+    Low-cardinality text becomes category, other text uses STRING_DTYPE.
+    """
+    n_distinct = n_distinct or {}
+    plan = {}
+    for col, pg_type in column_types.items():
+        if pg_type in PG_DTYPES:
+            plan[col] = PG_DTYPES[pg_type]
+        elif pg_type in TEXT_PG_TYPES:
+            distinct = n_distinct.get(col, 0)
+            if col.lower() in CATEGORY_COLUMNS or 0 < distinct <= CATEGORY_MAX_DISTINCT:
+                plan[col] = 'category'
+            else:
+                plan[col] = STRING_DTYPE
+    return plan
+
+
+def apply_dtype_plan(df: pd.DataFrame, plan: Dict[str, str]) -> pd.DataFrame:
+    """Convert each planned column once; columns that fail to convert are left as they are"""
+    for col, dtype in plan.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        try:
+            if dtype.startswith('datetime64'):
+                df[col] = pd.to_datetime(df[col], errors='coerce', utc=dtype.endswith('UTC]'))
+            else:
+                df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError) as e:
+            print(f"Could not convert {col} to {dtype}: {e}")
+    return df
+
+
+def _concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate chunks, giving categorical columns a shared category set so they stay categorical"""
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            categories = chunks[0][col].cat.categories.append(
+                [chunk[col].cat.categories for chunk in chunks[1:]]).unique()
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+class SchemaCache:
+    """
+    Column names, Postgres data types and the planned pandas dtypes per table, in DataFrame casing.
+
+    Entries are keyed by table and tagged with a fingerprint of the table's pg_attribute
+    rows, so information_schema and pg_stats are only queried again after the column set changes.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _schema_version(cursor, table_name: str) -> str:
+        """Cheap fingerprint of the table's live columns and their types"""
+        cursor.execute("""
+            SELECT md5(string_agg(attnum || ':' || attname || ':' || atttypid, ',' ORDER BY attnum))
+            FROM pg_attribute
+            WHERE attrelid = %s::regclass
+            AND attnum > 0
+            AND NOT attisdropped
+        """, (table_name,))
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _load(cursor, table_name: str) -> Tuple[List[str], Dict[str, str]]:
+        cursor.execute(f"""
+            SELECT column_name, data_type 
+            FROM information_schema.columns 
+            WHERE table_name = '{table_name.split('.')[-1]}'
+            AND table_schema = '{table_name.split('.')[0]}'
+            ORDER BY ordinal_position
+        """)
+        metadata = cursor.fetchall()
+        columns = [frame_column(table_name, row[0]) for row in metadata]
+        column_types = dict(zip(columns, (row[1] for row in metadata)))
+        return columns, column_types
+
+    @staticmethod
+    def _load_n_distinct(cursor, table_name: str) -> Dict[str, float]:
+        """Planner n_distinct per column; negative values are a fraction of the row count"""
+        cursor.execute("""
+            SELECT attname, n_distinct
+            FROM pg_stats
+            WHERE schemaname = %s
+            AND tablename = %s
+        """, (table_name.split('.')[0], table_name.split('.')[-1]))
+        return {frame_column(table_name, row[0]): row[1] for row in cursor.fetchall()}
+
+    def get(self, cursor, table_name: str) -> Tuple[List[str], Dict[str, str], Dict[str, str]]:
+        """Return (columns, column_types, dtype_plan) for table_name, reloading them only if the schema changed"""
+        version = self._schema_version(cursor, table_name)
+        with self._lock:
+            entry = self._entries.get(table_name)
+        if entry and entry[0] == version:
+            return list(entry[1]), dict(entry[2]), dict(entry[3])
+
+        columns, column_types = self._load(cursor, table_name)
+        dtype_plan = plan_dtypes(column_types, self._load_n_distinct(cursor, table_name))
+        with self._lock:
+            self._entries[table_name] = (version, columns, column_types, dtype_plan)
+        if entry:
+            print(f"Schema of {table_name} changed, reloaded {len(columns)} columns")
+        return list(columns), dict(column_types), dict(dtype_plan)
+
+    def invalidate(self, table_name: str = None):
+        """Drop the cached schema for one table, or for all tables"""
+        with self._lock:
+            if table_name:
+                self._entries.pop(table_name, None)
+            else:
+                self._entries.clear()
+
+
+SCHEMA_CACHE = SchemaCache()
+
+
+def _arrow_string_dtype(arrow_type):
+    """types_mapper keeping Arrow strings as STRING_DTYPE when converting Arrow data to pandas"""
+    if arrow_type in (pa.string(), pa.large_string()):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+class ChunkSpool:
+    """
+    Collects the chunks of one table load under a memory budget.
+
+    Chunks are kept in memory until process RSS has grown by memory_budget_mb since the load
+    started, so memory held by other tables doesn't count against it. From then on the
+    buffered chunks are appended to an Arrow IPC stream file in spill_dir and released, and
+    finish() rebuilds the table from the memory-mapped file. Peak memory during a large load
+    is then close to the final table size instead of chunks plus their concatenated copy.
+    Spilling needs pyarrow; without it chunks always stay in memory. close() releases the
+    spill file and must be called even when the load fails.
+    """
+    def __init__(self, table_name: str, memory_budget_mb: float = None, spill_dir: str = None):
+        self.table_name = table_name
+        self.memory_budget_mb = memory_budget_mb if HAS_PYARROW else None
+        self.spill_dir = spill_dir or tempfile.gettempdir()
+        self.spilled_rows = 0
+        self.start_memory_mb = get_memory_usage()
+        self.peak_memory_mb = self.start_memory_mb
+        self._chunks = []
+        self._resident = []  # Chunks that could not be converted to the spill schema
+        self._writer = None
+        self._schema = None
+        self._path = None
+
+    def append(self, df_chunk: pd.DataFrame):
+        self._chunks.append(df_chunk)
+        memory = get_memory_usage()
+        self.peak_memory_mb = max(self.peak_memory_mb, memory)
+        growth = memory - self.start_memory_mb
+        if self.memory_budget_mb and growth > self.memory_budget_mb:
+            first_spill = self._writer is None
+            self._spill()
+            if first_spill:
+                print(f"\nMemory grew {growth:.2f} MB, over budget for {self.table_name}, "
+                      f"spilling chunks to {self._path}")
+
+    @staticmethod
+    def _spillable(df_chunk: pd.DataFrame) -> pd.DataFrame:
+        # Chunk category sets differ, so categories are written as text and restored by the dtype plan
+        for col in df_chunk.columns:
+            if isinstance(df_chunk[col].dtype, pd.CategoricalDtype):
+                df_chunk[col] = df_chunk[col].astype(STRING_DTYPE)
+        return df_chunk
+
+    def _spill(self):
+        for df_chunk in self._chunks:
+            df_chunk = self._spillable(df_chunk)
+            if self._writer is None:
+                schema = pa.Schema.from_pandas(df_chunk, preserve_index=False)
+                self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                          for field in schema])
+                fd, self._path = tempfile.mkstemp(prefix=f"{self.table_name}-", suffix='.arrows', dir=self.spill_dir)
+                os.close(fd)
+                self._writer = pa.ipc.new_stream(self._path, self._schema)
+            try:
+                self._writer.write_table(pa.Table.from_pandas(df_chunk, schema=self._schema, preserve_index=False))
+                self.spilled_rows += len(df_chunk)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                self._resident.append(df_chunk)
+        self._chunks.clear()
+
+    def finish(self, dtype_plan: Dict[str, str]) -> Optional[pd.DataFrame]:
+        """Combined frame of every appended chunk, or None if there were none"""
+        if self._writer is None:
+            return _concat_chunks(self._chunks) if self._chunks else None
+
+        self._spill()
+        self._writer.close()
+        self._writer = None
+        try:
+            with pa.memory_map(self._path) as source:
+                table = pa.ipc.open_stream(source).read_all()
+            # self_destruct frees each Arrow column as soon as it is converted
+            final_df = table.to_pandas(split_blocks=True, self_destruct=True, types_mapper=_arrow_string_dtype)
+            del table
+        finally:
+            self.close()
+        if self._resident:
+            final_df = pd.concat([final_df] + self._resident, ignore_index=True)
+            self._resident.clear()
+        return apply_dtype_plan(final_df, dtype_plan)
+
+    def close(self):
+        """Close and delete the spill file, if any; safe to call more than once"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+
+def _cursor_chunks(conn: psycopg2.extensions.connection, query: str, columns: List[str], chunk_size: int):
+    """Yield DataFrame chunks built from a named server-side cursor"""
+    with conn.cursor('large_data_cursor') as data_cursor:
+        data_cursor.execute(query)
+        while True:
+            data = data_cursor.fetchmany(chunk_size)
+            if not data:
+                break
+            yield pd.DataFrame(data, columns=columns)
+
+
+def _copy_chunks(conn: psycopg2.extensions.connection, query: str, columns: List[str],
+                 column_types: Dict[str, str], dtype_plan: Dict[str, str], chunk_size: int):
+    """
+    Yield DataFrame chunks parsed by the pandas C reader from COPY (query) TO STDOUT.
+
+    COPY runs on a background thread writing CSV into a pipe, so rows are parsed
+    column by column as they stream instead of becoming Python tuples first.
+    NULL is sent as \\N so it stays distinct from empty strings.
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        with os.fdopen(write_fd, 'wb') as writer:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '\\N')", writer)
+            except Exception as e:
+                errors.append(e)
+
+    text_columns = {col: dtype_plan.get(col, str) for col in columns
+                    if column_types.get(col) not in NUMERIC_PG_TYPES | DATETIME_PG_TYPES}
+    date_columns = [col for col in columns if column_types.get(col) in DATETIME_PG_TYPES]
+
+    producer = threading.Thread(target=produce, name='copy-producer', daemon=True)
+    producer.start()
+    try:
+        with os.fdopen(read_fd, 'rb') as reader:
+            try:
+                for df_chunk in pd.read_csv(reader, header=None, names=columns, dtype=text_columns,
+                                            parse_dates=date_columns, na_values=['\\N'],
+                                            keep_default_na=False, true_values=['t'],
+                                            false_values=['f'], chunksize=chunk_size):
+                    yield df_chunk
+            except pd.errors.EmptyDataError:
+                pass
+    finally:
+        producer.join()
+    if errors:
+        raise errors[0]
+
+
+def _estimate_row_count(cursor, query: str) -> int:
+    """Planner row estimate for query, which for a full table scan comes from pg_class.reltuples"""
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(int(plan[0]['Plan']['Plan Rows']), 0)
+
+
+def fetch_table_data(table_name: str, conn: psycopg2.extensions.connection, last_update: datetime = None,
+                     raise_errors: bool = False, engine: str = None, count_mode: str = None,
+                     schema_cache: SchemaCache = None, memory_budget_mb: float = None,
+                     spill_dir: str = None) -> pd.DataFrame:
+    """
+    Fetch data from specified table with optional incremental loading.
+    engine is 'cursor' or 'copy' and defaults to the table's entry in TABLE_FETCH_ENGINES.
+    count_mode is 'exact', 'estimate' or 'none' and defaults to TABLE_COUNT_MODES; only
+    'exact' runs a COUNT(*) before the fetch. Column metadata comes from schema_cache,
+    the shared SCHEMA_CACHE by default. Past memory_budget_mb of RSS growth during the load (default from
+    TABLE_MEMORY_BUDGETS_MB) chunks are spilled to spill_dir, see ChunkSpool.
+    Errors are logged and an empty DataFrame returned unless raise_errors is set.
+    """
+    engine = engine or TABLE_FETCH_ENGINES.get(table_name, 'cursor')
+    count_mode = count_mode or TABLE_COUNT_MODES.get(table_name, 'exact')
+    schema_cache = schema_cache or SCHEMA_CACHE
+    memory_budget_mb = memory_budget_mb or TABLE_MEMORY_BUDGETS_MB.get(table_name)
     try:
-        timestamp_columns = {
-            'dc1.events': 'created_ts',
-            'dc1sm_ro.incidents': 'update_time',
-            'dc1sm_ro.rfc': 'update_time',
-            'dc1sm_ro.problems': 'update_time',
-            'dc1sm_ro.problem_tasks': 'update_time',
-            'itsm_owner.cis': 'pfz_added_time'
-        }
-        
         with conn.cursor() as cursor:
-            cursor.execute(f"""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = '{table_name.split('.')[-1]}'
-                AND table_schema = '{table_name.split('.')[0]}'
-                ORDER BY ordinal_position
-            """)
-            columns = [row[0] for row in cursor.fetchall()]
-
-            if 'events' in table_name:
-                columns = [col.lower() for col in columns]
-            else:
-                columns = [col.upper() for col in columns]
+            stage_start = time.perf_counter()
+            columns, column_types, dtype_plan = schema_cache.get(cursor, table_name)
+            LOADER_STAGE_SECONDS.observe(time.perf_counter() - stage_start, table=table_name, stage='schema')
 
             columns_str = ', '.join(columns)
+            timestamp_type = (column_types.get(frame_column(table_name, TIMESTAMP_COLUMNS[table_name]))
+                              if table_name in TIMESTAMP_COLUMNS else None)
             
-            if last_update and table_name in timestamp_columns:
+            if last_update and table_name in TIMESTAMP_COLUMNS:
                 query = f"""
                     SELECT {columns_str} 
                     FROM {table_name}
-                    WHERE {timestamp_columns[table_name]} >= '{last_update.strftime('%Y-%m-%d %H:%M:%S')}'
+                    WHERE {TIMESTAMP_COLUMNS[table_name]} >= '{timestamp_literal(last_update, timestamp_type)}'
                 """
                 if 'incidents' in table_name:
                     query += " ORDER BY open_time DESC"
+            elif table_name in TABLE_RETENTION:
+                # A full load only fetches the rows the retention policy would keep
+                window, max_rows = TABLE_RETENTION[table_name]
+                timestamp_column = TIMESTAMP_COLUMNS[table_name]
+                query = f"""
+                    SELECT {columns_str} 
+                    FROM {table_name}
+                """
+                if window:
+                    cutoff = timestamp_literal(datetime.now(timezone.utc) - window, timestamp_type)
+                    query += f" WHERE {timestamp_column} >= '{cutoff}'"
+                if max_rows:
+                    limit_column = TABLE_ROW_LIMIT_ORDER.get(table_name, timestamp_column)
+                    query += f" ORDER BY {limit_column} DESC LIMIT {max_rows}"
             else:
-                if 'incidents' in table_name:
-                    seven_days_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-                    query = f"""
-                        SELECT {columns_str} 
-                        FROM {table_name}
-                        WHERE update_time >= '{seven_days_ago}'
-                        ORDER BY open_time DESC
-                        LIMIT 200000
-                    """
-                else:
-                    query = f"""
-                        SELECT {columns_str} 
-                        FROM {table_name}
-                    """
+                query = f"""
+                    SELECT {columns_str} 
+                    FROM {table_name}
+                """
 
             # Get row count
-            count_query = query.replace(columns_str, 'COUNT(*)', 1)
-            if 'ORDER BY' in count_query:
-                count_query = count_query[:count_query.index('ORDER BY')]
-            cursor.execute(count_query)
-            total_rows = cursor.fetchone()[0]
-            print(f"Total rows to fetch from {table_name}: {total_rows:,}")
-
-            if total_rows == 0:
-                return pd.DataFrame(columns=columns)
+            stage_start = time.perf_counter()
+            if count_mode == 'exact':
+                count_query = query.replace(columns_str, 'COUNT(*)', 1)
+                if 'ORDER BY' in count_query:
+                    count_query = count_query[:count_query.index('ORDER BY')]
+                cursor.execute(count_query)
+                total_rows = cursor.fetchone()[0]
+                print(f"Total rows to fetch from {table_name}: {total_rows:,}")
+
+                if total_rows == 0:
+                    return pd.DataFrame(columns=columns)
+            elif count_mode == 'estimate':
+                # Only sizes the progress bar, an empty result is handled by the fetch loop
+                total_rows = _estimate_row_count(cursor, query)
+                print(f"Estimated rows to fetch from {table_name}: ~{total_rows:,}")
+            else:
+                total_rows = None
+                print(f"Fetching {table_name} without a row count")
+            LOADER_STAGE_SECONDS.observe(time.perf_counter() - stage_start, table=table_name, stage='count')
 
             chunk_size = 50000
-            chunks = []
-            rows_processed = 0
+            spool = ChunkSpool(table_name, memory_budget_mb, spill_dir)
+            try:
+                rows_processed = 0
             
-            with conn.cursor('large_data_cursor') as data_cursor:
-                data_cursor.execute(query)
-                
-                with tqdm(total=total_rows, unit='rows', desc=f'Fetching {table_name}', leave=True) as pbar:
+                if engine == 'copy':
+                    chunk_source = _copy_chunks(conn, query, columns, column_types, dtype_plan, chunk_size)
+                else:
+                    chunk_source = _cursor_chunks(conn, query, columns, chunk_size)
+
+                # Time blocked on the next chunk is database/parse time, the rest is DataFrame building
+                query_seconds = build_seconds = 0.0
+                fetched_bytes = 0
+                # Closing the generator on any error stops the COPY producer / named cursor before
+                # the connection goes back to the pool
+                with closing(chunk_source) as chunks, \
+                        tqdm(total=total_rows, unit='rows', desc=f'Fetching {table_name}', leave=True) as pbar:
                     while True:
-                        data = data_cursor.fetchmany(chunk_size)
-                        if not data:
+                        stage_start = time.perf_counter()
+                        df_chunk = next(chunks, None)
+                        build_start = time.perf_counter()
+                        query_seconds += build_start - stage_start
+                        if df_chunk is None:
                             break
-                        df_chunk = pd.DataFrame(data, columns=columns)
-                        df_chunk = optimize_dataframe(df_chunk)
-                        chunks.append(df_chunk)
+                        df_chunk = apply_dtype_plan(df_chunk, dtype_plan)
+                        fetched_bytes += int(df_chunk.memory_usage(index=False).sum())
+                        spool.append(df_chunk)
+                        build_seconds += time.perf_counter() - build_start
                         rows_processed += len(df_chunk)
                         pbar.update(len(df_chunk))
-                        
+                    
                         if rows_processed % 500000 == 0:
                             current_memory = get_memory_usage()
                             print(f"\nProcessed {rows_processed:,} rows. Memory usage: {current_memory:.2f} MB")
-                
-                if chunks:
-                    print("\nCombining chunks...")
-                    final_df = pd.concat(chunks, ignore_index=True)
-                    chunks.clear()
-                    gc.collect()
-                    final_df = optimize_dataframe(final_df)
+            
+                print("\nCombining chunks...")
+                stage_start = time.perf_counter()
+                final_df = spool.finish(dtype_plan)
+                gc.collect()
+                LOADER_STAGE_SECONDS.observe(query_seconds, table=table_name, stage='query')
+                LOADER_STAGE_SECONDS.observe(build_seconds, table=table_name, stage='build')
+                LOADER_STAGE_SECONDS.observe(time.perf_counter() - stage_start, table=table_name, stage='combine')
+                LOADER_ROWS_FETCHED.inc(rows_processed, table=table_name)
+                LOADER_BYTES_FETCHED.inc(fetched_bytes, table=table_name)
+                TABLE_LOAD_PEAK_MB.set(spool.peak_memory_mb, table=table_name)
+                print(f"Peak memory while loading {table_name}: {spool.peak_memory_mb:.2f} MB")
+                if final_df is not None:
                     return final_df
                 return pd.DataFrame(columns=columns)
+            finally:
+                spool.close()  # Removes the spill file if the load failed part-way
                     
     except Exception as e:
         print(f"Error: {table_name} - {str(e)}")
+        if raise_errors:
+            raise
         return pd.DataFrame()
 
 
+def dedupe_by_key(df: pd.DataFrame, key_column: str, order_column: str = None) -> pd.DataFrame:
+    """
+    Keep only the latest version of each key by order_column (by position when unavailable).
+    Surviving rows keep their input order, e.g. the query's ORDER BY.
+    """
+    df = df.reset_index(drop=True)
+    keys = df[key_column]
+    if not keys.duplicated().any():
+        return df
+    if order_column and order_column in df.columns:
+        ranked = df[order_column].sort_values(kind='stable').index.to_numpy()
+        keep = np.zeros(len(df), dtype=bool)
+        keep[ranked[~keys.take(ranked).duplicated(keep='last').to_numpy()]] = True
+    else:
+        keep = ~keys.duplicated(keep='last').to_numpy()
+    return df[keep].reset_index(drop=True)
+
+
+def _assign_rows(df: pd.DataFrame, column: str, positions: np.ndarray, values: pd.Series):
+    """Overwrite df[column] at the given row positions, widening the dtype if needed"""
+    target = df[column]
+    if target.dtype != values.dtype:
+        try:
+            common = np.promote_types(target.dtype, values.dtype)
+        except TypeError:
+            common = np.dtype(object)
+        if common != target.dtype:
+            df[column] = target.astype(common)
+    df.iloc[positions, df.columns.get_loc(column)] = values.to_numpy()
+
+
+def _align_categories(existing: pd.DataFrame, delta: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Recode delta's categorical columns onto existing's categories, adding any new values to existing"""
+    for col in existing.columns.intersection(delta.columns):
+        if isinstance(existing[col].dtype, pd.CategoricalDtype):
+            new_values = pd.Index(delta[col].dropna().astype(object).unique()).difference(
+                existing[col].cat.categories)
+            if len(new_values):
+                existing[col] = existing[col].cat.add_categories(new_values)
+            delta[col] = pd.Categorical(delta[col], categories=existing[col].cat.categories)
+    return existing, delta
+
+
+class KeyIndex:
+    """
+    Row positions of the unique keys of a merged frame, held as a few pd.Index segments.
+
+    Appended keys get a segment of their own instead of rehashing the table. The newest
+    segments are merged whenever the last is at least as long as the one before it, so
+    segments stay O(log n) and each key is rehashed O(log n) times over its lifetime.
+    """
+    def __init__(self, segments: List[Tuple[int, pd.Index]]):
+        self._segments = segments
+        self._length = sum(len(index) for _, index in segments)
+
+    @classmethod
+    def from_keys(cls, keys) -> 'KeyIndex':
+        return cls([(0, pd.Index(keys))])
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def get_indexer(self, keys) -> np.ndarray:
+        """Position of each key, -1 where it is absent"""
+        keys = pd.Index(keys)
+        positions = np.full(len(keys), -1, dtype=np.intp)
+        for offset, index in self._segments:
+            found = index.get_indexer(keys)
+            hit = found >= 0
+            positions[hit] = found[hit] + offset
+        return positions
+
+    def append(self, keys) -> 'KeyIndex':
+        """Index extended by keys placed after the current rows; self is left unchanged"""
+        if not len(keys):
+            return self
+        segments = self._segments + [(self._length, pd.Index(keys))]
+        while len(segments) > 1 and len(segments[-1][1]) >= len(segments[-2][1]):
+            (offset, previous), (_, last) = segments[-2], segments[-1]
+            segments[-2:] = [(offset, previous.append(last))]
+        return KeyIndex(segments)
+
+
+def _unchanged_rows(existing: pd.DataFrame, rows: pd.DataFrame, positions: np.ndarray) -> np.ndarray:
+    """Which rows equal the existing rows at positions in every shared column, nulls matching nulls"""
+    same = np.ones(len(rows), dtype=bool)
+    for col in existing.columns.intersection(rows.columns):
+        old = existing[col].iloc[positions].reset_index(drop=True)
+        new = rows[col].reset_index(drop=True)
+        if isinstance(old.dtype, pd.CategoricalDtype) or isinstance(new.dtype, pd.CategoricalDtype):
+            old, new = old.astype(object), new.astype(object)
+        try:
+            equal = (old == new).fillna(False).to_numpy(dtype=bool)
+        except TypeError:  # e.g. naive and aware timestamps
+            equal = (old.astype(object) == new.astype(object)).to_numpy(dtype=bool)
+        same &= equal | (old.isna() & new.isna()).to_numpy()
+    return same
+
+
+def upsert_dataframe(existing: pd.DataFrame, delta: pd.DataFrame, key_column: str,
+                     key_index: Optional[KeyIndex] = None, tombstone: Tuple = None,
+                     order_column: str = None, copy: bool = False) -> Tuple[pd.DataFrame, KeyIndex, np.ndarray, int]:
+    """
+    Merge an incremental fetch into an existing DataFrame keyed on key_column.
+
+    Rows whose key already exists are overwritten in place, new keys are appended
+    and rows matching the tombstone (column, values) are removed. key_index is the
+    KeyIndex of existing keys from the previous merge; updates reuse its hash tables
+    and appends only hash the new keys, so key handling costs O(len(delta)). Only
+    tombstone drops rebuild it. Delta rows equal to their existing row are skipped, and
+    when nothing changes existing itself is returned. With copy set, existing is left
+    untouched and updates are written into a copy instead. Returns the merged frame,
+    the key index to pass into the next call, per merged row its position in existing
+    if the row is unchanged or -1 if it was updated or appended, and the number of
+    rows updated, appended or dropped.
+    """
+    delta = dedupe_by_key(delta, key_column, order_column)
+    if key_index is None or len(key_index) != len(existing):
+        key_index = KeyIndex.from_keys(existing[key_column])
+
+    positions = key_index.get_indexer(delta[key_column])
+    matched = positions >= 0
+    if tombstone and tombstone[0] in delta.columns:
+        dead = delta[tombstone[0]].isin(tombstone[1]).to_numpy()
+    else:
+        dead = np.zeros(len(delta), dtype=bool)
+
+    update_mask = matched & ~dead
+    if update_mask.any():
+        update_mask[update_mask] = ~_unchanged_rows(existing, delta[update_mask], positions[update_mask])
+    source = np.arange(len(existing), dtype=np.int64)
+    if not update_mask.any() and not (matched & dead).any() and not (~matched & ~dead).any():
+        return existing, key_index, source, 0
+    source[positions[update_mask]] = -1
+    if copy:
+        # Only row updates write into column buffers; otherwise a shallow copy keeps existing intact
+        existing = existing.copy(deep=bool(update_mask.any()))
+    existing, delta = _align_categories(existing, delta)
+    if update_mask.any():
+        updates = delta[update_mask]
+        for col in existing.columns.intersection(updates.columns):
+            _assign_rows(existing, col, positions[update_mask], updates[col])
+
+    drop_positions = positions[matched & dead]
+    appends = delta[~matched & ~dead]
+    if len(drop_positions):
+        existing = existing.drop(index=existing.index[drop_positions])
+        source = np.delete(source, drop_positions)
+    if len(drop_positions) or not appends.empty:
+        existing = pd.concat([existing, appends], ignore_index=True)
+        source = np.concatenate([source, np.full(len(appends), -1, dtype=np.int64)])
+    if len(drop_positions):
+        # Drops shift the positions of every later row
+        key_index = KeyIndex.from_keys(existing[key_column])
+    else:
+        key_index = key_index.append(appends[key_column])
+
+    changed_rows = int(update_mask.sum()) + len(drop_positions) + len(appends)
+    return existing, key_index, source, changed_rows
+
+
+def _as_datetimes(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors='coerce')
+
+
+def retention_mask(df: pd.DataFrame, order_column: str, window: timedelta = None,
+                   max_rows: int = None, now: datetime = None, rank_column: str = None) -> Optional[np.ndarray]:
+    """
+    Boolean mask of the rows in df to keep under a retention policy, or None if all are kept.
+
+    Rows whose order_column is older than now - window are dropped, then only the newest
+    max_rows by rank_column (order_column by default) remain. Rows without a timestamp
+    never expire but are the first to go when the frame is over max_rows.
+    """
+    if order_column not in df.columns or (window is None and max_rows is None):
+        return None
+    timestamps = _as_datetimes(df[order_column])
+    keep = np.ones(len(df), dtype=bool)
+    if window is not None:
+        cutoff = to_utc(now or datetime.now(timezone.utc)) - window
+        if getattr(timestamps.dtype, 'tz', None) is None:
+            cutoff = cutoff.astimezone().replace(tzinfo=None)
+        keep &= ~(timestamps < cutoff).to_numpy()
+    if max_rows is not None and keep.sum() > max_rows:
+        if rank_column is not None and rank_column in df.columns:
+            timestamps = _as_datetimes(df[rank_column])
+        # NaT sorts as the smallest int64, so undated rows are evicted before dated ones
+        ages = timestamps.to_numpy(dtype='datetime64[ns]', na_value=np.datetime64('NaT')).view('i8')
+        ages = np.where(keep, ages, np.iinfo(np.int64).min)
+        newest = np.argpartition(ages, len(ages) - max_rows)[len(ages) - max_rows:]
+        keep = np.zeros(len(df), dtype=bool)
+        keep[newest] = True
+    return None if keep.all() else keep
+
+
+class DataSnapshot:
+    """
+    One published generation of the loaded DataFrames.
+
+    A snapshot is never modified after it is published: a refresh builds the next
+    generation's frames separately and swaps the loader's reference in one assignment,
+    so readers holding a snapshot never see a half-refreshed table. derived holds
+    structures computed from this generation's frames, such as search indexes.
+
+    row_sources maps a table to (base generation, source) when its frame was derived from
+    that generation's frame: source gives each row's position in the base frame, or -1
+    for rows that are new or changed, and is None when the frame is the base frame itself.
+    Derived structures use it to carry work forward instead of rebuilding.
+    """
+    __slots__ = ('generation', 'dataframes', 'created_at', 'derived', 'row_sources')
+
+    def __init__(self, generation: int, dataframes: Dict[str, pd.DataFrame], created_at: datetime = None,
+                 row_sources: Dict[str, Tuple[int, Optional[np.ndarray]]] = None):
+        self.generation = generation
+        self.dataframes = MappingProxyType(dict(dataframes))
+        self.created_at = created_at or datetime.now()
+        self.derived = {}
+        self.row_sources = row_sources or {}
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        return self.dataframes[key]
+
+    def get(self, key: str, default=None):
+        return self.dataframes.get(key, default)
+
+
+# Called with each new snapshot before it is published, e.g. to build search indexes
+PUBLISH_LISTENERS = []
+
+
+def add_publish_listener(callback):
+    """Register callback(snapshot) to run on every snapshot before readers can see it"""
+    PUBLISH_LISTENERS.append(callback)
+
+
+# Called on the publishing thread with each snapshot once it is current and no publish lock is held
+AFTER_PUBLISH_LISTENERS = []
+
+
+def add_after_publish_listener(callback):
+    """Register callback(snapshot) to run on every snapshot right after it is published"""
+    AFTER_PUBLISH_LISTENERS.append(callback)
+
+
+class LiveTables(Mapping):
+    """Read-only dict view of a loader's tables that resolves each lookup against its latest snapshot"""
+    def __init__(self, loader: 'PeriodicDataLoader'):
+        self._loader = loader
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        return self._loader.snapshot()[key]
+
+    def __iter__(self):
+        return iter(self._loader.snapshot().dataframes)
+
+    def __len__(self) -> int:
+        return len(self._loader.snapshot().dataframes)
+
+
+def save_snapshot(snapshot: DataSnapshot, directory: str, last_update: Optional[datetime],
+                  watermarks: Dict[str, datetime] = None, changed: Set[str] = None):
+    """
+    Write the snapshot's frames as Arrow IPC (Feather) files plus a manifest with the watermark.
+
+    Each save goes to its own gen-* directory and the CURRENT pointer is replaced atomically
+    afterwards, so a crash mid-write leaves the previous snapshot usable. Only the tables in
+    changed (all by default) are written; the others are hard-linked from the previous save.
+    """
+    os.makedirs(directory, exist_ok=True)
+    pointer = os.path.join(directory, 'CURRENT')
+    previous = None
+    if changed is not None and os.path.exists(pointer):
+        with open(pointer) as f:
+            previous = os.path.join(directory, f.read().strip())
+    name = f"gen-{datetime.now().strftime('%Y%m%d%H%M%S')}-{snapshot.generation}"
+    target = os.path.join(directory, name)
+    os.makedirs(target)
+    for key, df in snapshot.dataframes.items():
+        path = os.path.join(target, f"{key}.arrow")
+        if previous is not None and key not in changed:
+            try:
+                os.link(os.path.join(previous, f"{key}.arrow"), path)
+                continue
+            except OSError:
+                pass  # Missing from the previous save, or links unsupported: write it
+        df.reset_index(drop=True).to_feather(path, compression='uncompressed')
+    manifest = {
+        'generation': snapshot.generation,
+        'last_update': last_update.isoformat() if last_update else None,
+        'watermarks': {key: value.isoformat() for key, value in (watermarks or {}).items()},
+        'tables': sorted(snapshot.dataframes),
+        'saved_at': datetime.now().isoformat()
+    }
+    with open(os.path.join(target, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + '.tmp', pointer)
+
+    for entry in os.listdir(directory):
+        if entry.startswith('gen-') and entry != name:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def load_snapshot(directory: str) -> Optional[Tuple[Dict[str, pd.DataFrame], Dict]]:
+    """Memory-map the last saved snapshot, returning (frames, manifest) or None if there is none"""
+    pointer = os.path.join(directory, 'CURRENT')
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        target = os.path.join(directory, f.read().strip())
+    with open(os.path.join(target, 'manifest.json')) as f:
+        manifest = json.load(f)
+    frames = {
+        key: pa.feather.read_table(os.path.join(target, f"{key}.arrow"), memory_map=True).to_pandas(
+            split_blocks=True, self_destruct=True, types_mapper=_arrow_string_dtype)
+        for key in manifest['tables']
+    }
+    return frames, manifest
+
+
+class RefreshSchedule:
+    """
+    Adaptive refresh interval of one table.
+
+    Busy tables (deltas of REFRESH_BUSY_ROWS or more) are refreshed twice as often, quiet
+    ones back off by REFRESH_BACKOFF, and the interval never drops below REFRESH_COST_FACTOR
+    times what the last refresh cost, all within [min_seconds, max_seconds]. The next run is
+    due one jittered interval after the previous one started, so cycles don't drift.
+    """
+    def __init__(self, min_seconds: float, initial_seconds: float, max_seconds: float):
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.interval = initial_seconds
+        self.next_due = 0.0  # time.monotonic() value
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_due
+
+    def _wait(self, interval: float) -> float:
+        if datetime.now().hour in DB_PEAK_HOURS:
+            interval *= DB_PEAK_FACTOR
+        return interval * random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER)
+
+    def defer(self, now: float):
+        """Schedule the first run one interval from now"""
+        self.next_due = now + self._wait(self.interval)
+
+    def record(self, started: float, delta_rows: Optional[int], cost_seconds: float, failed: bool = False):
+        """Adapt the interval to a finished refresh that began at started; delta_rows is None for a full load"""
+        if failed:
+            # Retry soon, but at least one wait after the failed run ended so a slow failure can't loop
+            wait = self._wait(self.min_seconds)
+            self.next_due = max(started, time.monotonic()) + wait
+            return
+        if delta_rows is not None:
+            if delta_rows >= REFRESH_BUSY_ROWS:
+                self.interval /= 2
+            elif delta_rows == 0:
+                self.interval *= REFRESH_BACKOFF
+        self.interval = min(max(self.interval, self.min_seconds, cost_seconds * REFRESH_COST_FACTOR), self.max_seconds)
+        self.next_due = max(started + self._wait(self.interval), time.monotonic())
+
+
 class PeriodicDataLoader:
     """Class to manage periodic data loading and updates"""
-    def __init__(self, interval_minutes=15):
+    def __init__(self, interval_minutes=15, max_workers=1, pool: PostgresConnectionPool = None,
+                 snapshot_dir: str = None):
         self.interval_minutes = interval_minutes
-        self.dataframes = {}
-        self.last_update = None
+        self.snapshot_dir = snapshot_dir if HAS_PYARROW else None  # Saved at most every SNAPSHOT_SAVE_INTERVAL seconds when set
+        self.max_workers = max_workers  # Tables fetched concurrently, each on its own connection
+        self.pool = pool or get_connection_pool(max_size=max(max_workers, 6))
+        self._snapshot = DataSnapshot(0, {})
+        self._publish_lock = threading.Lock()
+        self.last_update = None  # Start of the last refresh in which every refreshed table succeeded, UTC
+        self.watermarks = {}  # Per table, the latest timestamp-column value fetched so far, as aware UTC
+        self.table_timings = {}
+        self.table_errors = {}
+        self.table_delta_rows = {}  # Rows each table's last refresh actually changed
+        self._key_indexes = {}
+        self._unsaved = set()  # Tables changed since the last snapshot save
+        self._last_save = 0.0  # time.monotonic() of the last snapshot save
+        self._refresh_lock = threading.Lock()  # Serializes update_data so refreshes never overlap
         self.tables = {
             'events': 'dc1.events',
             'incidents': 'dc1sm_ro.incidents',
@@ -190,45 +1207,327 @@ class PeriodicDataLoader:
             'problem_tasks': 'dc1sm_ro.problem_tasks',
             'ci': 'itsm_owner.cis'
         }
+        default_interval = interval_minutes * 60
+        self.schedules = {
+            key: RefreshSchedule(*TABLE_REFRESH_INTERVALS.get(table_name, (default_interval,) * 3))
+            for key, table_name in self.tables.items()
+        }
         self._stop_event = threading.Event()
         self._update_thread = None
 
-    def update_data(self):
-        """Update all tables with new data"""
+    def snapshot(self) -> DataSnapshot:
+        """Current published snapshot; hold on to it for the duration of a request"""
+        return self._snapshot
+
+    @property
+    def generation(self) -> int:
+        """Generation number of the current snapshot, incremented on every publish"""
+        return self._snapshot.generation
+
+    @property
+    def dataframes(self) -> Mapping:
+        """Tables of the current snapshot"""
+        return self._snapshot.dataframes
+
+    def _publish(self, frames: Dict[str, pd.DataFrame], sources: Dict[str, np.ndarray] = None):
+        """
+        Make frames the current snapshot with a single reference swap. sources holds the
+        row sources (see DataSnapshot) of tables changed relative to the current snapshot.
+        """
+        with self._publish_lock:
+            previous = self._snapshot
+            sources = sources or {}
+            row_sources = {}
+            for key, df in frames.items():
+                if key in sources:
+                    row_sources[key] = (previous.generation, sources[key])
+                elif previous.get(key) is df:
+                    row_sources[key] = (previous.generation, None)
+            snapshot = DataSnapshot(previous.generation + 1, frames, row_sources=row_sources)
+            for callback in PUBLISH_LISTENERS:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Publish listener {getattr(callback, '__name__', callback)} failed: {e}")
+            self._snapshot = snapshot
+        for callback in AFTER_PUBLISH_LISTENERS:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"After-publish listener {getattr(callback, '__name__', callback)} failed: {e}")
+        SNAPSHOT_GENERATION.set(snapshot.generation)
+        for key, df in frames.items():
+            if previous.get(key) is not df:
+                TABLE_ROWS.set(len(df), table=self.tables.get(key, key))
+                TABLE_BYTES.set(int(df.memory_usage(index=False).sum()), table=self.tables.get(key, key))
+        print(f"Published data generation {self._snapshot.generation}")
+
+    def update_data(self, keys: List[str] = None):
+        """Update the given tables (all by default) with new data, fetching up to max_workers concurrently"""
+        with self._refresh_lock:
+            self._update_data(list(keys or self.tables))
+
+    def _update_data(self, keys: List[str]):
         try:
-            print(f"\nUpdating data at {datetime.now()}")
-            conn = connect_to_postgres({})
-            
-            for key, table_name in self.tables.items():
-                print(f"\nProcessing: {table_name}")
-                new_data = fetch_table_data(table_name, conn, self.last_update)
-                
-                if not new_data.empty:
-                    if key in self.dataframes:
-                        # Remove duplicates and combine with new data
-                        self.dataframes[key] = pd.concat([new_data, self.dataframes[key]], ignore_index=True)
-                        print(f"Updated {key} - total rows: {len(self.dataframes[key])}")
-                    else:
-                        self.dataframes[key] = new_data
-                        print(f"Initialized {key} with {len(new_data)} rows")
-                
-            conn.close()
-            self.last_update = datetime.now()
-            print(f"Update completed at {self.last_update}")
+            print(f"\nUpdating {', '.join(keys)} at {datetime.now()}")
+            started = datetime.now(timezone.utc)
+            refresh_start = time.perf_counter()
+            self.table_errors = {}
+            frames = dict(self._snapshot.dataframes)
+            sources = {}  # Row sources of changed tables relative to the current snapshot
+            changed_keys = set()
+
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='table-fetch') as executor:
+                futures = {
+                    executor.submit(self._fetch_table, self.tables[key], self._fetch_since(key)): key
+                    for key in keys
+                }
+                # Merge on this thread as each fetch finishes; a failed table leaves the others intact
+                for future in as_completed(futures):
+                    key = futures[future]
+                    table_name = self.tables[key]
+                    try:
+                        new_data, elapsed = future.result()
+                        self.table_timings[key] = elapsed
+                        LOADER_STAGE_SECONDS.observe(elapsed, table=table_name, stage='fetch')
+                        with LOADER_STAGE_SECONDS.time(table=table_name, stage='merge'):
+                            self.table_delta_rows[key] = self._merge_table(key, table_name, new_data, frames, sources)
+                        if self.table_delta_rows[key]:
+                            changed_keys.add(key)
+                        self._advance_watermark(key, table_name, new_data)
+                    except Exception as e:
+                        self.table_errors[key] = repr(e)
+                        LOADER_TABLE_ERRORS.inc(table=table_name)
+                        print(f"Error updating {table_name}: {e}")
+
+            # Windows move with the clock, so retention runs even for tables without new rows
+            for key in keys:
+                table_name = self.tables[key]
+                if key in frames:
+                    with LOADER_STAGE_SECONDS.time(table=table_name, stage='retention'):
+                        if self._apply_retention(key, table_name, frames, sources):
+                            changed_keys.add(key)
+
+            self._unsaved |= changed_keys
+            if changed_keys:
+                with LOADER_STAGE_SECONDS.time(table='all', stage='publish'):
+                    self._publish(frames, sources)
+            # Failed tables keep their watermark, so their delta is fetched again next cycle
+            if not self.table_errors:
+                self.last_update = started
+            if self._unsaved and self.snapshot_dir and time.monotonic() - self._last_save >= SNAPSHOT_SAVE_INTERVAL:
+                with LOADER_STAGE_SECONDS.time(table='all', stage='save_snapshot'):
+                    self._save_snapshot()
+            for key, lag in self.table_lag().items():
+                if lag is not None:
+                    TABLE_LAG_SECONDS.set(lag, table=self.tables[key])
+            get_memory_usage()
+            LOADER_REFRESH_SECONDS.observe(time.perf_counter() - refresh_start)
+            LOADER_REFRESHES.inc(outcome='partial' if self.table_errors else 'ok')
+            timings = ', '.join(f"{key}={secs:.1f}s" for key, secs in self.table_timings.items())
+            print(f"Update completed in {time.perf_counter() - refresh_start:.1f}s ({timings})")
             gc.collect()
             
         except Exception as e:
+            LOADER_REFRESHES.inc(outcome='failed')
             print(f"Error updating data: {e}")
 
-    def start_periodic_updates(self):
-        """Start background thread for periodic updates"""
+    def _save_snapshot(self):
+        """Persist the current snapshot and watermark to snapshot_dir, rewriting only the unsaved tables"""
+        start = time.perf_counter()
+        try:
+            unsaved = set(self._unsaved)
+            save_snapshot(self._snapshot, self.snapshot_dir, self.last_update, self.watermarks, changed=unsaved)
+            self._unsaved -= unsaved
+            self._last_save = time.monotonic()
+            print(f"Saved snapshot to {self.snapshot_dir} in {time.perf_counter() - start:.1f}s "
+                  f"({', '.join(sorted(unsaved))} rewritten)")
+        except Exception as e:
+            print(f"Error saving snapshot: {e}")
+
+    def load_snapshot(self) -> bool:
+        """Publish the snapshot saved in snapshot_dir and resume from its watermark; False if none was loaded"""
+        if not self.snapshot_dir:
+            return False
+        start = time.perf_counter()
+        try:
+            loaded = load_snapshot(self.snapshot_dir)
+        except Exception as e:
+            print(f"Error loading snapshot: {e}")
+            return False
+        if loaded is None:
+            return False
+        frames, manifest = loaded
+        self._key_indexes = {}
+        self._unsaved = set()
+        self._last_save = time.monotonic()
+        self._publish(frames)
+        # Older manifests hold naive local times; to_utc brings them to the aware UTC convention
+        self.last_update = to_utc(datetime.fromisoformat(manifest['last_update'])) if manifest['last_update'] else None
+        self.watermarks = {key: to_utc(datetime.fromisoformat(value))
+                           for key, value in manifest.get('watermarks', {}).items()}
+        if self.last_update:
+            # Snapshots saved before per-table watermarks resume from the refresh time
+            for key in frames:
+                self.watermarks.setdefault(key, self.last_update)
+        print(f"Loaded snapshot from {self.snapshot_dir} in {time.perf_counter() - start:.1f}s, "
+              f"resuming from {self.watermarks}")
+        return True
+
+    def _fetch_table(self, table_name: str, last_update: Optional[datetime]) -> Tuple[pd.DataFrame, float]:
+        """Fetch one table on a pooled connection, returning the data and elapsed seconds"""
+        start = time.perf_counter()
+        print(f"\nProcessing: {table_name}")
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    new_data = fetch_table_data(table_name, conn, last_update, raise_errors=True)
+                break
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # The broken connection was discarded, retry once on a fresh one
+                if attempt:
+                    raise
+                print(f"Connection lost while fetching {table_name}, retrying: {e}")
+        return new_data, time.perf_counter() - start
+
+    def _fetch_since(self, key: str) -> Optional[datetime]:
+        """Lower bound of the next incremental fetch, None for a full load"""
+        watermark = self.watermarks.get(key)
+        return watermark - WATERMARK_OVERLAP if watermark else None
+
+    def _advance_watermark(self, key: str, table_name: str, new_data: pd.DataFrame):
+        """Move the table's watermark to the newest timestamp actually fetched, never backwards"""
+        column = frame_column(table_name, TIMESTAMP_COLUMNS[table_name])
+        if new_data.empty or column not in new_data.columns:
+            return
+        latest = pd.to_datetime(new_data[column], errors='coerce').max()
+        if pd.isna(latest):
+            return
+        latest = to_utc(latest.to_pydatetime())
+        current = self.watermarks.get(key)
+        if current is None or latest > current:
+            self.watermarks[key] = latest
+
+    def table_lag(self) -> Dict[str, Optional[float]]:
+        """Seconds between now and each table's watermark, None for tables without one"""
+        lag = {}
+        for key in self.tables:
+            watermark = self.watermarks.get(key)
+            if watermark is None:
+                lag[key] = None
+            else:
+                lag[key] = (datetime.now(timezone.utc) - watermark).total_seconds()
+        return lag
+
+    def _merge_table(self, key: str, table_name: str, new_data: pd.DataFrame,
+                     frames: Dict[str, pd.DataFrame], sources: Dict[str, np.ndarray]) -> int:
+        """
+        Merge freshly fetched rows into frames[key] for the next snapshot, returning how many rows
+        it changed. Rows re-read unchanged (e.g. in the WATERMARK_OVERLAP) don't count, and when
+        nothing changed frames[key] stays the published frame. The merged rows' sources relative
+        to the current snapshot are recorded in sources.
+        """
+        if new_data.empty:
+            return 0
+        key_column = frame_column(table_name, TABLE_PRIMARY_KEYS[table_name])
+        order_column = frame_column(table_name, TIMESTAMP_COLUMNS[table_name])
+        initialized = key in frames
+        existing = frames[key] if initialized else new_data.iloc[:0]
+        # Replace changed rows by primary key, append new ones, drop tombstones.
+        # The published frame may be in use by readers, so the merge works on a copy.
+        merged, self._key_indexes[key], source, changed_rows = upsert_dataframe(
+            existing, new_data, key_column,
+            key_index=self._key_indexes.get(key),
+            tombstone=self._tombstone(table_name),
+            order_column=order_column,
+            copy=True
+        )
+        if not initialized:
+            frames[key] = merged
+            print(f"Initialized {key} with {len(merged)} rows")
+            return len(merged)
+        if not changed_rows:
+            print(f"No changes in {key} ({len(new_data)} rows re-read)")
+            return 0
+        frames[key] = merged
+        sources[key] = source
+        print(f"Updated {key} - {changed_rows} changed rows, total rows: {len(merged)}")
+        return changed_rows
+
+    def _apply_retention(self, key: str, table_name: str, frames: Dict[str, pd.DataFrame],
+                         sources: Dict[str, np.ndarray]) -> bool:
+        """
+        Evict rows outside the table's TABLE_RETENTION policy from frames[key], returning whether
+        any were. Nothing is evicted until the expired rows reach RETENTION_SLACK of the table.
+        """
+        if table_name not in TABLE_RETENTION:
+            return False
+        window, max_rows = TABLE_RETENTION[table_name]
+        df = frames[key]
+        rank_column = TABLE_ROW_LIMIT_ORDER.get(table_name)
+        keep = retention_mask(df, frame_column(table_name, TIMESTAMP_COLUMNS[table_name]), window, max_rows,
+                              rank_column=frame_column(table_name, rank_column) if rank_column else None)
+        if keep is None or len(df) - np.count_nonzero(keep) < RETENTION_SLACK * len(df):
+            return False
+        # One boolean take per column builds the next frame; the published one stays intact for readers
+        frames[key] = df[keep].reset_index(drop=True)
+        if key in sources:
+            sources[key] = sources[key][keep]
+        elif self._snapshot.get(key) is df:
+            sources[key] = np.flatnonzero(keep)
+        # Evicted rows shift every later position, so the next merge rebuilds the key index
+        self._key_indexes.pop(key, None)
+        LOADER_ROWS_EVICTED.inc(len(df) - len(frames[key]), table=table_name)
+        print(f"Evicted {len(df) - len(frames[key]):,} expired rows from {key}, total rows: {len(frames[key])}")
+        return True
+
+    @staticmethod
+    def _tombstone(table_name: str) -> Optional[Tuple]:
+        """Tombstone (column, values) for a table, with the column in DataFrame casing"""
+        if table_name not in TABLE_TOMBSTONES:
+            return None
+        column, values = TABLE_TOMBSTONES[table_name]
+        return frame_column(table_name, column), values
+
+    def _refresh_due(self, keys: List[str]):
+        """Refresh keys in one cycle and reschedule each from its delta size and cost"""
+        started = time.monotonic()
+        full_loads = {key for key in keys if self.watermarks.get(key) is None}
+        self.update_data(keys)
+        for key in keys:
+            schedule = self.schedules[key]
+            schedule.record(started, None if key in full_loads else self.table_delta_rows.get(key),
+                            self.table_timings.get(key, 0.0), failed=key in self.table_errors)
+            TABLE_REFRESH_INTERVAL.set(schedule.interval, table=self.tables[key])
+        intervals = ', '.join(f"{key}={self.schedules[key].interval:.0f}s" for key in keys)
+        print(f"Next refresh intervals: {intervals}")
+
+    def start_periodic_updates(self, run_immediately: bool = False):
+        """
+        Start the background scheduler, optionally refreshing every table right away.
+
+        Each table is refreshed on its own RefreshSchedule; tables that fall due together
+        share one update_data cycle and cycles never overlap. stop_updates() interrupts the
+        wait between cycles immediately.
+        """
         def update_loop():
+            now = time.monotonic()
+            for schedule in self.schedules.values():
+                if run_immediately:
+                    schedule.next_due = now
+                else:
+                    schedule.defer(now)
             while not self._stop_event.is_set():
-                time.sleep(self.interval_minutes * 60)
-                if not self._stop_event.is_set():
-                    self.update_data()
+                now = time.monotonic()
+                due = [key for key, schedule in self.schedules.items() if schedule.due(now)]
+                if due:
+                    self._refresh_due(due)
+                    continue
+                next_due = min(schedule.next_due for schedule in self.schedules.values())
+                self._stop_event.wait(next_due - now)
 
-        self._update_thread = threading.Thread(target=update_loop, daemon=True)
+        self._stop_event.clear()
+        self._update_thread = threading.Thread(target=update_loop, name='table-refresh', daemon=True)
         self._update_thread.start()
 
     def stop_updates(self):
@@ -236,11 +1535,47 @@ class PeriodicDataLoader:
         self._stop_event.set()
         if self._update_thread:
             self._update_thread.join()
+        if self._unsaved and self.snapshot_dir:
+            with self._refresh_lock:
+                self._save_snapshot()
+
+
+_data_loader = None
+
+
+def get_data_loader() -> PeriodicDataLoader:
+    """Loader started by get_all_tables, for readers that need snapshots or the generation counter"""
+    return _data_loader
+
+
+def get_snapshot() -> DataSnapshot:
+    """
+    Current snapshot of the tables loaded by get_all_tables, empty until the loader has started.
+    Requests read every table from one snapshot so a refresh during the request can't mix generations.
+    """
+    if _data_loader is None:
+        return DataSnapshot(0, {})
+    return _data_loader.snapshot()
+
+
+def require_tables(snapshot: DataSnapshot, table_keys):
+    """Raise a 503 HTTPException unless every table a search needs is in the snapshot, e.g. before the first load"""
+    from fastapi import HTTPException
+    missing = [key for key in table_keys if snapshot.get(key) is None]
+    if missing:
+        raise HTTPException(status_code=503, detail=f"Data not loaded yet: {', '.join(missing)}")
 
 
-def get_all_tables() -> Dict[str, pd.DataFrame]:
+def get_all_tables() -> Mapping:
     """Main function to fetch all tables and return as dictionary of DataFrames with automatic updates"""
-    loader = PeriodicDataLoader(interval_minutes=15)  # Change to 30 for 30-minute intervals
-    loader.update_data()  # Initial load
-    loader.start_periodic_updates()  # Start periodic updates
-    return loader.dataframes
+    global _data_loader
+    loader = PeriodicDataLoader(interval_minutes=15, max_workers=4,
+                                snapshot_dir='data_snapshot')  # Per-table intervals: TABLE_REFRESH_INTERVALS
+    if loader.load_snapshot():
+        # Serve the saved snapshot right away and catch up from its watermark in the background
+        loader.start_periodic_updates(run_immediately=True)
+    else:
+        loader.update_data()  # Initial load
+        loader.start_periodic_updates()  # Start periodic updates
+    _data_loader = loader
+    return LiveTables(loader)
@@ -0,0 +1,569 @@
+"""
+Reproducible benchmarks for the loader, search and feedback paths.
+
+Synthetic tables shaped like dc1.events, incidents and CIs are generated from a fixed seed and
+served either by FakeConnection (no database needed) or by a scratch Postgres given with --dsn.
+Results are written as JSON and can be compared against an earlier run:
+
+    python benchmark.py --events 2000000 --output bench.json
+    python benchmark.py --output new.json --baseline bench.json
+    python benchmark.py --dsn "host=localhost dbname=bench" --sections load
+
+With --baseline the exit status is 1 when any metric regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+import app
+import search_index
+from feedback_store import FeedbackAggregates, FeedbackStore
+from search_executor import SEARCH_EXECUTORS, SearchExecutor, SearchOverloaded
+
+SECTIONS = ['load', 'search', 'concurrency', 'feedback']
+
+WORDS = np.array([
+    'cpu', 'memory', 'disk', 'latency', 'timeout', 'error', 'warning', 'threshold', 'exceeded', 'service',
+    'database', 'network', 'interface', 'down', 'restart', 'backup', 'failed', 'login', 'certificate',
+    'expired', 'queue', 'replication', 'lag', 'packet', 'loss', 'storage', 'volume', 'full', 'process',
+    'crashed', 'heartbeat', 'missing', 'unreachable', 'degraded', 'cluster', 'node', 'power', 'supply',
+    'temperature', 'high', 'low', 'utilization', 'connection', 'refused', 'license', 'job', 'batch'
+], dtype=object)
+SITES = np.array(['dc1', 'dc2', 'lon', 'nyc', 'sgp', 'fra'], dtype=object)
+ROLES = np.array(['app', 'db', 'web', 'mq', 'fs', 'lb', 'esx'], dtype=object)
+GROUPS = np.array(['Network Ops', 'Database Support', 'Unix Support', 'Windows Support', 'Storage',
+                   'Service Desk', 'Middleware', 'Cloud Platform'], dtype=object)
+
+# Table key -> (Postgres table, {column: Postgres type}) in the database's lowercase column names
+TABLE_SCHEMAS = {
+    'events': ('dc1.events', {
+        'event_id': 'bigint',
+        'created_ts': 'timestamp without time zone',
+        'col1': 'text',
+        'col2': 'text',
+        'status': 'text',
+        'priority': 'text'
+    }),
+    'incidents': ('dc1sm_ro.incidents', {
+        'numberprgn': 'text',
+        'open_time': 'timestamp without time zone',
+        'update_time': 'timestamp without time zone',
+        'col3': 'text',
+        'col4': 'text',
+        'status': 'text',
+        'severity': 'text'
+    }),
+    'ci': ('itsm_owner.cis', {
+        'logical_name': 'text',
+        'pfz_added_time': 'timestamp without time zone',
+        'col5': 'text',
+        'col6': 'text',
+        'type': 'text',
+        'location': 'text',
+        'istatus': 'text'
+    })
+}
+
+
+def _phrases(rng: np.random.Generator, rows: int, words: int) -> np.ndarray:
+    """rows random messages of the given number of words"""
+    picks = WORDS[rng.integers(0, len(WORDS), size=(rows, words))]
+    text = pd.Series(picks[:, 0])
+    for i in range(1, words):
+        text = text + ' ' + picks[:, i]
+    return text.to_numpy()
+
+
+def _hostnames(rng: np.random.Generator, rows: int, distinct: int) -> np.ndarray:
+    """rows host names drawn from a pool of distinct names such as dc1-db-0042"""
+    pool = pd.Series(SITES[rng.integers(0, len(SITES), distinct)]) + '-' + \
+        ROLES[rng.integers(0, len(ROLES), distinct)] + '-' + \
+        pd.Series(np.arange(distinct)).map('{:04d}'.format)
+    return pool.to_numpy()[rng.integers(0, distinct, rows)]
+
+
+def _timestamps(rng: np.random.Generator, rows: int, days: float, now: datetime) -> np.ndarray:
+    seconds = rng.integers(0, int(days * 86400), rows)
+    return (np.datetime64(now.replace(microsecond=0)) - seconds.astype('timedelta64[s]')).astype('datetime64[ns]')
+
+
+def generate_table(table_key: str, rows: int, seed: int = 0, now: datetime = None) -> pd.DataFrame:
+    """
+    Synthetic rows for a table in TABLE_SCHEMAS, as the database would hold them.
+
+    The same seed and now always give the same frame. Timestamps fall inside the table's
+    TABLE_RETENTION window so a full load keeps every row.
+    """
+    rng = np.random.default_rng(seed)
+    now = now or datetime.now()
+    if table_key == 'events':
+        return pd.DataFrame({
+            'event_id': np.arange(10_000_000, 10_000_000 + rows, dtype=np.int64),
+            'created_ts': _timestamps(rng, rows, 25, now),
+            'col1': _phrases(rng, rows, 6),
+            'col2': _hostnames(rng, rows, 20000),
+            'status': rng.choice(['Open', 'Acknowledged', 'Closed', 'Suppressed'], rows),
+            'priority': rng.choice(['P1', 'P2', 'P3', 'P4', 'P5'], rows)
+        })
+    if table_key == 'incidents':
+        update_time = _timestamps(rng, rows, 6, now)
+        return pd.DataFrame({
+            'numberprgn': pd.Series(np.arange(rows) + 1_000_000).map('IM{:08d}'.format).to_numpy(),
+            'open_time': update_time - rng.integers(0, 3 * 86400, rows).astype('timedelta64[s]'),
+            'update_time': update_time,
+            'col3': _phrases(rng, rows, 8),
+            'col4': GROUPS[rng.integers(0, len(GROUPS), rows)],
+            'status': rng.choice(['Open', 'Work In Progress', 'Pending', 'Resolved', 'Closed'], rows),
+            'severity': rng.choice(['1', '2', '3', '4'], rows)
+        })
+    if table_key == 'ci':
+        return pd.DataFrame({
+            'logical_name': pd.Series(np.arange(rows)).map('CI{:09d}'.format).to_numpy(),
+            'pfz_added_time': _timestamps(rng, rows, 3 * 365, now),
+            'col5': _hostnames(rng, rows, max(rows, 1)),
+            'col6': _phrases(rng, rows, 4),
+            'type': rng.choice(['server', 'database', 'router', 'switch', 'application', 'storage'], rows),
+            'location': SITES[rng.integers(0, len(SITES), rows)],
+            'istatus': rng.choice(['In Use', 'Installed', 'Planned'], rows)
+        })
+    raise ValueError(f"Unknown table {table_key}")
+
+
+class FakeCursor:
+    """
+    Just enough of a psycopg2 cursor for fetch_table_data: the schema, stats and EXPLAIN
+    queries are answered from the frame and every data query returns all of its rows.
+    """
+    def __init__(self, connection: 'FakeConnection'):
+        self.connection = connection
+        self._rows = []
+        self._position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._rows = []
+
+    def execute(self, query: str, params=None):
+        conn = self.connection
+        self._position = 0
+        if 'pg_attribute' in query:
+            self._rows = [(conn.schema_version,)]
+        elif 'information_schema.columns' in query:
+            self._rows = list(conn.column_types.items())
+        elif 'pg_stats' in query:
+            self._rows = list(conn.n_distinct.items())
+        elif query.lstrip().startswith('EXPLAIN'):
+            self._rows = [([{'Plan': {'Plan Rows': len(conn.frame)}}],)]
+        elif 'COUNT(*)' in query:
+            self._rows = [(len(conn.frame),)]
+        else:
+            self._rows = conn.tuples()
+
+    def fetchone(self):
+        row = self._rows[self._position] if self._position < len(self._rows) else None
+        self._position += 1
+        return row
+
+    def fetchmany(self, size: int):
+        rows = self._rows[self._position:self._position + size]
+        self._position += size
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def copy_expert(self, sql: str, file, size: int = 1 << 20):
+        data = self.connection.csv()
+        for start in range(0, len(data), size):
+            file.write(data[start:start + size])
+
+
+class FakeConnection:
+    """
+    In-memory stand-in for a psycopg2 connection to one table.
+
+    Row tuples and COPY output are rendered once up front (see prepare) so timed loads
+    measure the loader's work, not the fake's.
+    """
+    def __init__(self, frame: pd.DataFrame, column_types: Dict[str, str]):
+        self.frame = frame
+        self.column_types = column_types
+        self.schema_version = str(hash(tuple(column_types.items())))
+        self.n_distinct = {col: float(frame[col].nunique()) for col, pg_type in column_types.items()
+                           if pg_type == 'text'}
+        self._tuples = None
+        self._csv = None
+
+    def prepare(self, engine: str):
+        if engine == 'copy':
+            self.csv()
+        else:
+            self.tuples()
+
+    def tuples(self) -> List[tuple]:
+        if self._tuples is None:
+            self._tuples = list(self.frame.itertuples(index=False, name=None))
+        return self._tuples
+
+    def csv(self) -> bytes:
+        if self._csv is None:
+            self._csv = self.frame.to_csv(header=False, index=False, na_rep='\\N',
+                                          date_format='%Y-%m-%d %H:%M:%S').encode('utf-8')
+        return self._csv
+
+    def release(self):
+        self._tuples = self._csv = None
+
+    def cursor(self, name: str = None) -> FakeCursor:
+        return FakeCursor(self)
+
+
+def seed_postgres(dsn: str, table_key: str, frame: pd.DataFrame):
+    """Recreate the table in a scratch Postgres database and COPY the synthetic rows into it"""
+    table_name, column_types = TABLE_SCHEMAS[table_key]
+    schema = table_name.split('.')[0]
+    columns = ', '.join(f'{col} {pg_type}' for col, pg_type in column_types.items())
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+        cursor.execute(f"CREATE TABLE {table_name} ({columns})")
+        buffer = io.StringIO(frame.to_csv(header=False, index=False, na_rep='\\N'))
+        cursor.copy_expert(f"COPY {table_name} FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        cursor.execute(f"ANALYZE {table_name}")
+    print(f"Seeded {table_name} with {len(frame):,} rows")
+
+
+class PeakMemory:
+    """Samples process RSS on a background thread and records the highest value seen"""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = app.get_memory_usage()
+        self._thread = threading.Thread(target=self._sample, name='peak-memory', daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, app.get_memory_usage())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, app.get_memory_usage())
+
+    @property
+    def growth_mb(self) -> float:
+        return self.peak_mb - self.start_mb
+
+
+def percentiles(name: str, seconds: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean of latencies in milliseconds, keyed name.p50_ms and so on"""
+    if not len(seconds):
+        return {}
+    ms = np.asarray(seconds) * 1000
+    return {
+        f'{name}.p50_ms': float(np.percentile(ms, 50)),
+        f'{name}.p95_ms': float(np.percentile(ms, 95)),
+        f'{name}.p99_ms': float(np.percentile(ms, 99)),
+        f'{name}.mean_ms': float(ms.mean())
+    }
+
+
+def _timed(fn: Callable, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench_load(sources: Dict[str, pd.DataFrame], engines: Sequence[str], dsn: str = None) -> Tuple[Dict, Dict]:
+    """Load every table with each engine; returns the metrics and the frames loaded last"""
+    results, frames = {}, {}
+    for table_key, source in sources.items():
+        table_name, column_types = TABLE_SCHEMAS[table_key]
+        fake = None if dsn else FakeConnection(source, column_types)
+
+        start = time.perf_counter()
+        app.optimize_dataframe(source.copy())
+        results[f'optimize.{table_key}.seconds'] = time.perf_counter() - start
+
+        for engine in engines:
+            if fake:
+                fake.prepare(engine)
+                conn = fake
+            else:
+                conn = psycopg2.connect(dsn)
+            try:
+                with PeakMemory() as memory:
+                    start = time.perf_counter()
+                    frame = app.fetch_table_data(table_name, conn, engine=engine, count_mode='none',
+                                                 schema_cache=app.SchemaCache(), raise_errors=True)
+                    elapsed = time.perf_counter() - start
+            finally:
+                if fake:
+                    fake.release()
+                else:
+                    conn.close()
+            name = f'load.{table_key}.{engine}'
+            results[f'{name}.seconds'] = elapsed
+            results[f'{name}.rows_per_sec'] = len(frame) / elapsed if elapsed else 0.0
+            results[f'{name}.peak_growth_mb'] = memory.growth_mb
+            results[f'{name}.frame_mb'] = frame.memory_usage(index=False, deep=True).sum() / 1024 / 1024
+            frames[table_key] = frame
+    return results, frames
+
+
+def _search_terms(frames: Dict[str, pd.DataFrame], count: int, rng: np.random.Generator) -> List[str]:
+    """Common words, host name fragments and a few misses, like the queries users type"""
+    hosts = app.frame_column('dc1.events', 'col2')
+    fragments = [host.split('-', 1)[1] for host in frames['events'][hosts].sample(count, replace=True, random_state=0)]
+    terms = list(rng.choice(WORDS, count)) + fragments + ['zzqx' + str(i) for i in range(max(count // 10, 1))]
+    rng.shuffle(terms)
+    return terms[:count]
+
+
+def bench_search(frames: Dict[str, pd.DataFrame], queries: int, seed: int) -> Tuple[Dict, app.DataSnapshot]:
+    results = {}
+    rng = np.random.default_rng(seed)
+    snapshot = app.DataSnapshot(1, frames)
+    for callback in app.PUBLISH_LISTENERS:
+        results[f'search.build.{callback.__name__}.seconds'] = _timed(callback, snapshot)
+
+    for table_key, column in search_index.ID_COLUMNS.items():
+        df = frames[table_key]
+        column = search_index.resolve_column(df, column)
+        keys = df[column].sample(queries, replace=True, random_state=seed).tolist()
+        latencies = [_timed(search_index.lookup_rows, snapshot, table_key, key) for key in keys]
+        results.update(percentiles(f'search.lookup.{table_key}', latencies))
+
+    terms = _search_terms(frames, queries, rng)
+    for table_key, columns in search_index.SEARCH_COLUMNS.items():
+        latencies = [_timed(search_index.search_text, snapshot, table_key, term, columns) for term in terms]
+        results.update(percentiles(f'search.text.{table_key}', latencies))
+        search_index.RESULT_CACHE.evict_before(snapshot.generation + 1)
+        for term in terms:
+            search_index.cached_search_text(snapshot, table_key, term, columns)
+        latencies = [_timed(search_index.cached_search_text, snapshot, table_key, term, columns) for term in terms]
+        results.update(percentiles(f'search.text_cached.{table_key}', latencies))
+    return results, snapshot
+
+
+def _universal_text_search(snapshot, term: str) -> int:
+    """The free-text part of UniversalSearch: one uncached search per table"""
+    return sum(len(search_index.search_text(snapshot, table_key, term, columns))
+               for table_key, columns in search_index.SEARCH_COLUMNS.items())
+
+
+def bench_concurrency(snapshot, concurrency: int, rounds: int, seed: int) -> Dict:
+    """Bursts of concurrent free-text searches through an executor configured like the 'text' lane"""
+    lane = SEARCH_EXECUTORS['text']
+    executor = SearchExecutor('bench', lane.max_workers, lane.max_queue, lane.timeout_seconds)
+    terms = _search_terms(dict(snapshot.dataframes), concurrency * rounds, np.random.default_rng(seed))
+    latencies, outcomes = [], {'ok': 0, 'rejected': 0, 'timeout': 0}
+
+    async def request(term: str):
+        start = time.perf_counter()
+        try:
+            await executor.run(_universal_text_search, snapshot, term)
+            latencies.append(time.perf_counter() - start)
+            outcomes['ok'] += 1
+        except SearchOverloaded:
+            outcomes['rejected'] += 1
+        except asyncio.TimeoutError:
+            outcomes['timeout'] += 1
+
+    async def run():
+        for i in range(rounds):
+            await asyncio.gather(*(request(term) for term in terms[i * concurrency:(i + 1) * concurrency]))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+
+    results = percentiles(f'concurrency.c{concurrency}', latencies)
+    results[f'concurrency.c{concurrency}.requests_per_sec'] = outcomes['ok'] / elapsed if elapsed else 0.0
+    results[f'concurrency.c{concurrency}.rejected'] = outcomes['rejected']
+    results[f'concurrency.c{concurrency}.timeouts'] = outcomes['timeout']
+    return results
+
+
+def _feedback_entry(i: int) -> dict:
+    entry = {
+        "tab_type": ['rca', 'triage', 'events', 'summary'][i % 4],
+        "user_id": f"user{i % 50}",
+        "is_positive": i % 3 != 0,
+        "llm_response": ["response one", "response two"] if i % 2 else "single response",
+        "timestamp": (datetime(2024, 1, 1) + timedelta(seconds=i)).isoformat()
+    }
+    if i % 5 == 0:
+        entry["text_feedback"] = f"feedback text {i}"
+    return entry
+
+
+def bench_feedback(entries: int, threads: int) -> Dict:
+    """Enqueue and durable-write throughput of FeedbackStore from concurrent writers, plus aggregate costs"""
+    results = {}
+    batch = [_feedback_entry(i) for i in range(entries)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'feedback.jsonl')
+        store = FeedbackStore(path=path, legacy_path=os.path.join(directory, 'missing.json'))
+        per_thread = [batch[i::threads] for i in range(threads)]
+        workers = [threading.Thread(target=lambda part=part: [store.append(entry) for entry in part])
+                   for part in per_thread]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        enqueued = time.perf_counter() - start
+        store.close()
+        written = time.perf_counter() - start
+        results[f'feedback.t{threads}.enqueue_per_sec'] = entries / enqueued
+        results[f'feedback.t{threads}.write_per_sec'] = entries / written
+
+        aggregates = FeedbackAggregates()
+        results['feedback.aggregate_per_sec'] = entries / _timed(lambda: [aggregates.record(e) for e in batch])
+        results['feedback.replay_per_sec'] = entries / _timed(FeedbackAggregates.from_log, path)
+    return results
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith('per_sec')
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Print each shared metric's change against the baseline and return the ones that regressed"""
+    regressions = []
+    print(f"\n{'metric':<55} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric in sorted(set(results) & set(baseline)):
+        old, new = baseline[metric], results[metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if _higher_is_better(metric) else change
+        flag = ' REGRESSION' if worse > tolerance else ''
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:<55} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=1_000_000, help='rows in the synthetic events table')
+    parser.add_argument('--incidents', type=int, default=200_000, help='rows in the synthetic incidents table')
+    parser.add_argument('--cis', type=int, default=300_000, help='rows in the synthetic CI table')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    parser.add_argument('--engines', nargs='+', choices=['cursor', 'copy'], default=['cursor', 'copy'])
+    parser.add_argument('--dsn', help='load through this scratch Postgres database instead of the fake cursor; '
+                                      'its benchmark tables are dropped and recreated')
+    parser.add_argument('--queries', type=int, default=200, help='queries per search latency measurement')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent searches per burst')
+    parser.add_argument('--rounds', type=int, default=5, help='bursts of concurrent searches')
+    parser.add_argument('--feedback-entries', type=int, default=50_000)
+    parser.add_argument('--feedback-threads', type=int, default=8)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='results file of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative slowdown before failing')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    now = datetime.now()
+    results = {}
+    rows = {'events': args.events, 'incidents': args.incidents, 'ci': args.cis}
+
+    needs_data = {'load', 'search', 'concurrency'} & set(args.sections)
+    frames = {}
+    if needs_data:
+        start = time.perf_counter()
+        sources = {key: generate_table(key, count, args.seed + i, now) for i, (key, count) in enumerate(rows.items())}
+        print(f"Generated {sum(map(len, sources.values())):,} rows in {time.perf_counter() - start:.1f}s")
+        if args.dsn:
+            for key, frame in sources.items():
+                seed_postgres(args.dsn, key, frame)
+        if 'load' in args.sections:
+            load_results, frames = bench_load(sources, args.engines, args.dsn)
+            results.update(load_results)
+        else:
+            # Search sections still need frames in the loader's casing and dtypes
+            frames = {key: app.apply_dtype_plan(
+                frame.rename(columns=lambda col, key=key: app.frame_column(TABLE_SCHEMAS[key][0], col)),
+                app.plan_dtypes({app.frame_column(TABLE_SCHEMAS[key][0], col): pg_type
+                                 for col, pg_type in TABLE_SCHEMAS[key][1].items()}))
+                for key, frame in sources.items()}
+        del sources
+
+    snapshot = None
+    if 'search' in args.sections or 'concurrency' in args.sections:
+        search_results, snapshot = bench_search(frames, args.queries, args.seed)
+        if 'search' in args.sections:
+            results.update(search_results)
+    if 'concurrency' in args.sections:
+        results.update(bench_concurrency(snapshot, args.concurrency, args.rounds, args.seed))
+    if 'feedback' in args.sections:
+        results.update(bench_feedback(args.feedback_entries, args.feedback_threads))
+
+    report = {
+        'meta': {
+            'started_at': now.isoformat(),
+            'source': 'postgres' if args.dsn else 'fake',
+            'rows': rows,
+            'seed': args.seed,
+            'sections': args.sections,
+            'engines': args.engines,
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'pyarrow': app.pa.__version__ if app.HAS_PYARROW else None,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nWrote {len(results)} metrics to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('rows') != rows or baseline['meta'].get('source') != report['meta']['source']:
+            print("Warning: baseline was run with different table sizes or data source")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from metrics import gauge, histogram
+
+FEEDBACK_QUEUE_DEPTH = gauge('feedback_queue_depth', 'Feedback entries waiting for the writer')
+FEEDBACK_WRITE_SECONDS = histogram('feedback_write_seconds', 'Time to write one batch to the feedback log')
+FEEDBACK_WRITE_BATCH = histogram('feedback_write_batch_entries', 'Entries per feedback log write',
+                                 buckets=(1, 5, 10, 50, 100, 250, 500, 1000))
+
+
+def migrate_legacy_feedback(legacy_path: str, path: str):
+    """One-time conversion of the old JSON array file into JSON Lines; the old file is kept as .migrated"""
+    if not os.path.exists(legacy_path) or os.path.exists(path):
+        return
+    with open(legacy_path, 'r') as f:
+        try:
+            entries = json.load(f)
+        except json.JSONDecodeError:
+            entries = []
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    os.rename(legacy_path, legacy_path + '.migrated')
+    print(f"Migrated {len(entries)} feedback entries from {legacy_path} to {path}")
+
+
+class FeedbackStore:
+    """
+    Append-only JSON Lines feedback log written by a background thread.
+
+    append() only enqueues, so request handlers never touch the file. The writer drains the
+    queue in batches of up to max_batch entries, flushes every batch and fsyncs at most every
+    fsync_interval seconds. Each entry is one line, so concurrent requests can't overwrite
+    each other and a write costs the same however large the log grows.
+    """
+    _STOP = object()
+
+    def __init__(self, path: str = "all_feedback.jsonl", legacy_path: str = "all_feedback.json",
+                 max_batch: int = 500, flush_interval: float = 0.5, fsync_interval: float = 5.0):
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._queue = queue.Queue()
+        migrate_legacy_feedback(legacy_path, path)
+        self._thread = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+        self._thread.start()
+
+    def append(self, entry: dict):
+        self._queue.put(entry)
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            last_fsync = time.monotonic()
+            while True:
+                batch = self._next_batch()
+                stop = any(entry is self._STOP for entry in batch)
+                entries = [entry for entry in batch if entry is not self._STOP]
+                FEEDBACK_QUEUE_DEPTH.set(self._queue.qsize())
+                write_start = time.perf_counter()
+                try:
+                    if entries:
+                        f.write(''.join(json.dumps(entry, default=str) + '\n' for entry in entries))
+                        f.flush()
+                    if stop or (entries and time.monotonic() - last_fsync >= self.fsync_interval):
+                        os.fsync(f.fileno())
+                        last_fsync = time.monotonic()
+                except Exception as e:
+                    print(f"Error writing feedback: {e}")
+                if entries:
+                    FEEDBACK_WRITE_SECONDS.observe(time.perf_counter() - write_start)
+                    FEEDBACK_WRITE_BATCH.observe(len(entries))
+                if stop:
+                    return
+
+    def close(self):
+        """Write everything queued so far, fsync and stop the writer"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+
+class FeedbackAggregates:
+    """
+    Positive/negative counts per tab, per user and per day/hour, plus an index of text feedback.
+
+    Built once from the log at startup and then updated per recorded entry, so stats requests
+    never rescan the feedback history.
+    """
+    GROUPS = ['tab_type', 'user', 'day', 'hour']
+
+    def __init__(self):
+        self._counts = {group: {} for group in self.GROUPS}
+        self._overall = [0, 0]
+        self._texts = []
+        self._texts_by_tab = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_log(cls, path: str) -> 'FeedbackAggregates':
+        aggregates = cls()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        aggregates.record(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+        return aggregates
+
+    def record(self, entry: dict):
+        tab_type = str(getattr(entry["tab_type"], 'value', entry["tab_type"]))
+        timestamp = entry.get("timestamp", "")
+        keys = {
+            'tab_type': tab_type,
+            'user': entry["user_id"],
+            'day': timestamp[:10],
+            'hour': timestamp[:13]
+        }
+        slot = 0 if entry["is_positive"] else 1
+        with self._lock:
+            self._overall[slot] += 1
+            for group, key in keys.items():
+                self._counts[group].setdefault(key, [0, 0])[slot] += 1
+            if entry.get("text_feedback"):
+                self._texts_by_tab.setdefault(tab_type, []).append(len(self._texts))
+                self._texts.append({
+                    "tab_type": tab_type,
+                    "user_id": entry["user_id"],
+                    "is_positive": entry["is_positive"],
+                    "text_feedback": entry["text_feedback"],
+                    "timestamp": timestamp
+                })
+
+    @staticmethod
+    def _summary(counts) -> dict:
+        positive, negative = counts
+        total = positive + negative
+        return {
+            "positive": positive,
+            "negative": negative,
+            "total": total,
+            "positive_ratio": positive / total if total else None
+        }
+
+    def stats(self, group_by: str, key: Optional[str] = None) -> dict:
+        """Counts and ratios of every bucket in a group, or of one bucket when key is given"""
+        with self._lock:
+            buckets = self._counts[group_by]
+            if key is not None:
+                selected = {key: buckets.get(key, [0, 0])}
+            else:
+                selected = dict(buckets)
+            overall = list(self._overall)
+        return {
+            "group_by": group_by,
+            "overall": self._summary(overall),
+            "buckets": {bucket: self._summary(counts) for bucket, counts in selected.items()}
+        }
+
+    def text_feedback(self, page: int, limit: int, tab_type: Optional[str] = None) -> dict:
+        """Newest-first page of entries that carry text feedback"""
+        with self._lock:
+            if tab_type:
+                positions = self._texts_by_tab.get(tab_type, [])
+                total = len(positions)
+                end = total - (page - 1) * limit
+                items = [self._texts[i] for i in reversed(positions[max(end - limit, 0):max(end, 0)])]
+            else:
+                total = len(self._texts)
+                end = total - (page - 1) * limit
+                items = list(reversed(self._texts[max(end - limit, 0):max(end, 0)]))
+        return {
+            "total": total,
+            "current_page": page,
+            "total_pages": (total + limit - 1) // limit,
+            "data": items
+        }
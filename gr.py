@@ -1,14 +1,69 @@
+import asyncio
+import time
+
+from app import get_snapshot, require_tables
+from metrics import counter, histogram, metrics_response
+from search_index import (MAX_PAGE_SIZE, RESULT_CACHE, SEARCH_COLUMNS, cached_search_text, decode_cursor, encode_cursor,
+                          lookup_rows)
+from search_executor import SEARCH_EXECUTORS, SearchOverloaded, executor_stats
+from serialization import RESPONSE_FORMATS, FastJSONResponse, ndjson_response, serialize_frame
+
+SEARCH_SECONDS = histogram('search_request_seconds', 'UniversalSearch latency including executor queueing',
+                           ['search_type', 'status'])
+SEARCH_REQUESTS = counter('search_requests_total', 'UniversalSearch requests', ['search_type', 'status'])
+
+QUERY_TYPE_TABLES = {'event_list': 'events', 'incident_list': 'incidents', 'ci_list': 'ci'}
+
+
+def determine_search_type(search_query):
+    """'incident' for IM numbers, 'event' for numeric IDs, otherwise a free-text 'ci' search"""
+    if search_query.upper().startswith('IM'):
+        return 'incident'
+    elif search_query[:1].isdigit():
+        return 'event'
+    else:
+        return 'ci'
+
+
 @app.get(path="/api/UniversalSearch", tags=['search_data'])
-def universal_search(
+async def universal_search(
     query: str = Query(..., description="Universal search across Incidents, Events, and CI records"),
-    limit: int = Query(default=10, description="Maximum number of results per type", ge=1),
+    limit: int = Query(default=10, description="Maximum number of results per type", ge=1, le=MAX_PAGE_SIZE),
     page: int = Query(default=1, description="Page number", ge=1),
-    query_type: str = Query(default=None, description="Filter results by type: event_list, incident_list, or ci_list")
+    query_type: str = Query(default=None, description="Filter results by type: event_list, incident_list, or ci_list"),
+    cursor: str = Query(default=None, description="Continuation token from a previous next_cursor; overrides page and limit"),
+    response_format: str = Query(default="records", description="Shape of each data list: records or columnar"),
+    stream: bool = Query(default=False, description="Stream every free-text match from the start index as NDJSON")
 ):
-    # Define search columns for each type
-    EVENT_SEARCH_COLUMNS = ['col1', 'col2']
-    INCIDENT_SEARCH_COLUMNS = ['col3', 'col4']
-    CI_SEARCH_COLUMNS = ['col5', 'col6']
+    # The pandas work runs on a dedicated executor; ID lookups use their own so they never wait on scans
+    search_type = determine_search_type(query)
+    lane = 'text' if search_type == 'ci' else 'lookup'
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await SEARCH_EXECUTORS[lane].run(
+            run_universal_search, query, limit, page, query_type, cursor, response_format, stream)
+        status = response.status_code
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except SearchOverloaded as e:
+        status = 503
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        status = 504
+        raise HTTPException(status_code=504, detail="Search timed out")
+    finally:
+        SEARCH_SECONDS.observe(time.perf_counter() - start, search_type=search_type, status=status)
+        SEARCH_REQUESTS.inc(search_type=search_type, status=status)
+
+
+def run_universal_search(query, limit, page, query_type, cursor, response_format, stream):
+    # Define search columns for each type (indexed for substring search in search_index)
+    EVENT_SEARCH_COLUMNS = SEARCH_COLUMNS['events']
+    INCIDENT_SEARCH_COLUMNS = SEARCH_COLUMNS['incidents']
+    CI_SEARCH_COLUMNS = SEARCH_COLUMNS['ci']
     
     # Define output columns for each type
     EVENT_OUTPUT_COLUMNS = ['col1', 'col2', 'status', 'priority']
@@ -23,21 +78,36 @@ def universal_search(
     if query_type and query_type.lower() not in valid_query_types:
         raise HTTPException(status_code=400, detail=f"Invalid query_type. Must be one of: {', '.join(valid_query_types)}")
     
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid response_format. Must be one of: {', '.join(RESPONSE_FORMATS)}")
+    
+    if cursor:
+        try:
+            start_idx, limit = decode_cursor(cursor, query, query_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+        page = start_idx // limit + 1
+    else:
+        start_idx = (page - 1) * limit
+    
+    search_type = determine_search_type(query)
+    snapshot = get_snapshot()
+    if search_type == 'incident':
+        require_tables(snapshot, ['incidents'])
+    elif search_type == 'event':
+        require_tables(snapshot, ['events'])
+    else:
+        require_tables(snapshot, [QUERY_TYPE_TABLES[query_type.lower()]] if query_type else QUERY_TYPE_TABLES.values())
+    events_df, incidents_df, ci_df = snapshot.get('events'), snapshot.get('incidents'), snapshot.get('ci')
+    
     try:
-        def determine_search_type(search_query):
-            if search_query.upper().startswith('IM'):
-                return 'incident'
-            elif search_query[0].isdigit():
-                return 'event'
-            else:
-                return 'ci'
-
         def prepare_for_json(df, output_columns):
-            df = df[output_columns].astype(str)
-            return df.to_dict(orient="records")
+            # Only the page's rows and output columns are converted
+            return serialize_frame(df, output_columns, response_format)
         
-        search_type = determine_search_type(query)
-        start_idx = (page - 1) * limit
+        def next_cursor(total):
+            next_idx = start_idx + limit
+            return encode_cursor(query, query_type, next_idx, limit) if next_idx < total else None
         
         search_metadata = {
             "search_query": query,
@@ -52,7 +122,7 @@ def universal_search(
 
         # Handle exact matches
         if search_type == 'incident':
-            filtered_df = incidents_df[incidents_df["NUMBERPRGN"] == query]
+            filtered_df = lookup_rows(snapshot, 'incidents', query)
             if filtered_df.empty:
                 raise HTTPException(status_code=404, detail="Incident not found")
             result = {
@@ -65,7 +135,7 @@ def universal_search(
             }
             
         elif search_type == 'event':
-            filtered_df = events_df[events_df["EVENT_ID"] == int(query)]
+            filtered_df = lookup_rows(snapshot, 'events', int(query))
             if filtered_df.empty:
                 raise HTTPException(status_code=404, detail="Event not found")
             result = {
@@ -80,6 +150,7 @@ def universal_search(
         else:  # Free text search
             result = {}
             total_matches = 0
+            stream_sources = []
             
             # Determine which searches to perform based on query_type
             do_event_search = not query_type or query_type.lower() == 'event_list'
@@ -87,52 +158,59 @@ def universal_search(
             do_ci_search = not query_type or query_type.lower() == 'ci_list'
             
             if do_event_search:
-                evt_mask = events_df[EVENT_SEARCH_COLUMNS].astype(str).apply(
-                    lambda x: x.str.contains(query, case=False)).any(axis=1)
-                evt_total = int(evt_mask.sum())
+                evt_positions = cached_search_text(snapshot, 'events', query, EVENT_SEARCH_COLUMNS)
+                evt_total = len(evt_positions)
                 evt_total_pages = int((evt_total + limit - 1) // limit)
-                evt_results = events_df[evt_mask].iloc[start_idx:start_idx + limit]
+                evt_results = events_df.iloc[evt_positions[start_idx:start_idx + limit]]
                 
                 result["Event List"] = {
                     "total_matches": evt_total,
                     "current_page": int(page),
                     "total_pages": evt_total_pages,
+                    "next_cursor": next_cursor(evt_total),
                     "data": prepare_for_json(evt_results, EVENT_OUTPUT_COLUMNS)
                 }
                 total_matches += evt_total
+                stream_sources.append(("Event List", events_df, evt_positions[start_idx:], EVENT_OUTPUT_COLUMNS))
 
             if do_incident_search:
-                inc_mask = incidents_df[INCIDENT_SEARCH_COLUMNS].astype(str).apply(
-                    lambda x: x.str.contains(query, case=False)).any(axis=1)
-                inc_total = int(inc_mask.sum())
+                inc_positions = cached_search_text(snapshot, 'incidents', query, INCIDENT_SEARCH_COLUMNS)
+                inc_total = len(inc_positions)
                 inc_total_pages = int((inc_total + limit - 1) // limit)
-                inc_results = incidents_df[inc_mask].iloc[start_idx:start_idx + limit]
+                inc_results = incidents_df.iloc[inc_positions[start_idx:start_idx + limit]]
                 
                 result["Incident List"] = {
                     "total_matches": inc_total,
                     "current_page": int(page),
                     "total_pages": inc_total_pages,
+                    "next_cursor": next_cursor(inc_total),
                     "data": prepare_for_json(inc_results, INCIDENT_OUTPUT_COLUMNS)
                 }
                 total_matches += inc_total
+                stream_sources.append(("Incident List", incidents_df, inc_positions[start_idx:], INCIDENT_OUTPUT_COLUMNS))
 
             if do_ci_search:
-                ci_mask = ci_df[CI_SEARCH_COLUMNS].astype(str).apply(
-                    lambda x: x.str.contains(query, case=False)).any(axis=1)
-                ci_total = int(ci_mask.sum())
+                ci_positions = cached_search_text(snapshot, 'ci', query, CI_SEARCH_COLUMNS)
+                ci_total = len(ci_positions)
                 ci_total_pages = int((ci_total + limit - 1) // limit)
-                ci_results = ci_df[ci_mask].iloc[start_idx:start_idx + limit]
+                ci_results = ci_df.iloc[ci_positions[start_idx:start_idx + limit]]
                 
                 result["CI List"] = {
                     "total_matches": ci_total,
                     "current_page": int(page),
                     "total_pages": ci_total_pages,
+                    "next_cursor": next_cursor(ci_total),
                     "data": prepare_for_json(ci_results, CI_OUTPUT_COLUMNS)
                 }
                 total_matches += ci_total
+                stream_sources.append(("CI List", ci_df, ci_positions[start_idx:], CI_OUTPUT_COLUMNS))
             
             if total_matches == 0:
                 raise HTTPException(status_code=404, detail="No records found")
+            
+            if stream:
+                # Rows are serialized in batches as the client reads, ending with a totals trailer
+                return ndjson_response(search_metadata, stream_sources)
         
         response_data = {
             "metadata": search_metadata,
@@ -140,7 +218,7 @@ def universal_search(
             "total_matches": 1 if search_type in ['incident', 'event'] else int(total_matches)
         }
         
-        return JSONResponse(content=response_data)
+        return FastJSONResponse(content=response_data)
     
     except ValueError as ve:
         error_response = {
@@ -150,7 +228,7 @@ def universal_search(
             "search_query": query,
             "detected_type": determine_search_type(query)
         }
-        return JSONResponse(content=error_response, status_code=400)
+        return FastJSONResponse(content=error_response, status_code=400)
     except HTTPException:
         raise
     except Exception as e:
@@ -161,4 +239,19 @@ def universal_search(
             "search_query": query,
             "detected_type": determine_search_type(query)
         }
-        return JSONResponse(content=error_response, status_code=400)
+        return FastJSONResponse(content=error_response, status_code=400)
+
+
+@app.get(path="/api/UniversalSearch/cache_stats", tags=['search_data'])
+def universal_search_cache_stats():
+    return FastJSONResponse(content=RESULT_CACHE.stats())
+
+
+@app.get(path="/api/UniversalSearch/executor_stats", tags=['search_data'])
+def universal_search_executor_stats():
+    return FastJSONResponse(content=executor_stats())
+
+
+@app.get(path="/metrics", tags=['monitoring'])
+def metrics():
+    return metrics_response()
@@ -0,0 +1,160 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import search_index
+from app import DataSnapshot, add_after_publish_listener, get_snapshot
+
+
+class SearchOverloaded(Exception):
+    """Raised when a search executor already holds as many requests as it accepts"""
+
+
+class SearchExecutor:
+    """
+    Dedicated, bounded thread pool for CPU-bound search work.
+
+    At most max_workers calls run at once and up to max_queue more wait; beyond that calls
+    are rejected with SearchOverloaded instead of piling up behind each other. run() waits
+    at most timeout_seconds for a result. A timed-out call that already started keeps its
+    slot until it finishes, so the bounds hold even for runaway searches.
+    """
+    def __init__(self, name: str, max_workers: int = 4, max_queue: int = 16, timeout_seconds: float = 10.0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.rejected = 0
+        self.timed_out = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'search-{name}')
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on this executor without blocking the event loop"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise SearchOverloaded(f"Too many concurrent {self.name} searches, try again shortly")
+            self._pending += 1
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"pending": self._pending, "max_workers": self.max_workers, "max_queue": self.max_queue,
+                    "timeout_seconds": self.timeout_seconds, "rejected": self.rejected,
+                    "timed_out": self.timed_out}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ID lookups and free-text searches get separate executors so cheap lookups never queue behind scans
+SEARCH_EXECUTORS = {
+    'lookup': SearchExecutor('lookup', max_workers=2, max_queue=64, timeout_seconds=2.0),
+    'text': SearchExecutor('text', max_workers=2, max_queue=8, timeout_seconds=15.0)
+}
+
+
+def _child_search_text(generation: int, table_key: str, query: str, columns: Optional[List[str]]) -> np.ndarray:
+    """Runs in a forked worker against the snapshot it inherited from the parent"""
+    snapshot = get_snapshot()
+    if snapshot.generation != generation:
+        raise RuntimeError(f"Worker holds generation {snapshot.generation}, request needs {generation}")
+    return search_index.search_text(snapshot, table_key, query, columns)
+
+
+def _child_generation() -> int:
+    return get_snapshot().generation
+
+
+class ProcessTextSearch:
+    """
+    Computes free-text match positions in forked worker processes, outside this process's GIL.
+
+    Workers are forked right after each snapshot is published, from the publishing thread
+    once the publish lock is released, and read its frames and indexes through copy-on-write
+    shared memory, so nothing is pickled but the query and the result positions. Requests
+    never fork: a request whose snapshot is not the pool's generation (e.g. one that started
+    before a publish) searches in the calling thread, as does any worker failure.
+    """
+    def __init__(self, max_workers: int = 2, timeout_seconds: float = 15.0):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self._pool = None
+        self._generation = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def refresh(self, snapshot: DataSnapshot):
+        """Replace the pool with workers forked from snapshot; registered as an after-publish listener"""
+        if self._closed or snapshot.generation == 0:
+            return
+        pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('fork'))
+        # Fork every worker now rather than on the first request's submit
+        try:
+            for future in [pool.submit(_child_generation) for _ in range(self.max_workers)]:
+                future.result(timeout=self.timeout_seconds)
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        with self._lock:
+            previous, self._pool, self._generation = self._pool, pool, snapshot.generation
+            if self._closed:
+                previous, self._pool = pool, None
+        if previous is not None:
+            previous.shutdown(wait=False, cancel_futures=True)
+
+    def search_text(self, snapshot: DataSnapshot, table_key: str, query: str,
+                    columns: Optional[List[str]] = None) -> np.ndarray:
+        with self._lock:
+            pool = self._pool if self._generation == snapshot.generation else None
+        if pool is None:
+            return search_index.search_text(snapshot, table_key, query, columns)
+        try:
+            future = pool.submit(_child_search_text, snapshot.generation, table_key, query, columns)
+            return future.result(timeout=self.timeout_seconds)
+        except Exception as e:
+            print(f"Process search failed, searching in-process: {e!r}")
+            return search_index.search_text(snapshot, table_key, query, columns)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+def enable_process_search(max_workers: int = 2, timeout_seconds: float = 15.0) -> ProcessTextSearch:
+    """Route uncached free-text searches to forked worker processes (POSIX only)"""
+    backend = ProcessTextSearch(max_workers=max_workers, timeout_seconds=timeout_seconds)
+    add_after_publish_listener(backend.refresh)
+    backend.refresh(get_snapshot())
+    search_index.set_text_search_backend(backend.search_text)
+    return backend
+
+
+def executor_stats() -> Dict[str, Dict]:
+    return {name: executor.stats() for name, executor in SEARCH_EXECUTORS.items()}
@@ -0,0 +1,483 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import weakref
+from array import array
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import DataSnapshot, add_publish_listener
+
+
+# Exact-match key column per table, matched case-insensitively against the loaded frame
+ID_COLUMNS = {
+    'incidents': 'NUMBERPRGN',
+    'events': 'EVENT_ID',
+    'ci': 'LOGICAL_NAME'
+}
+
+# Free-text search columns per table, shared by the UniversalSearch endpoint and the n-gram index
+SEARCH_COLUMNS = {
+    'events': ['col1', 'col2'],
+    'incidents': ['col3', 'col4'],
+    'ci': ['col5', 'col6']
+}
+
+# Text indexes built on publish, as (table, columns) for get_text_index; xzz.py searches every CI text column
+TEXT_INDEXES = [(table_key, None) for table_key in SEARCH_COLUMNS] + [('ci', 'text')]
+
+NGRAM_SIZE = 3
+
+# Largest page a search request may ask for, directly or through a cursor
+MAX_PAGE_SIZE = 1000
+
+_build_lock = threading.Lock()
+_vocabularies = weakref.WeakSet()
+
+
+def resolve_column(df: pd.DataFrame, name: str) -> Optional[str]:
+    """Return the frame's column matching name regardless of case, or None"""
+    if name in df.columns:
+        return name
+    for col in df.columns:
+        if str(col).lower() == name.lower():
+            return col
+    return None
+
+
+class IdIndex:
+    """Hash index from the values of one key column to their row positions"""
+    def __init__(self, df: pd.DataFrame, column: str):
+        self.column = column
+        self._index = pd.Index(df[column])
+        self._index.is_unique  # Builds the hash table now instead of on the first lookup
+
+    def lookup(self, key) -> np.ndarray:
+        """Row positions holding key, empty when it is absent"""
+        positions = self._index.get_indexer_for([key])
+        return positions[positions >= 0]
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class NgramVocabulary:
+    """
+    Distinct lowercased values of one column and an n-gram inverted index over them.
+
+    Values are only appended, so an id keeps its value for the vocabulary's lifetime and
+    indexes of older snapshots stay valid while a refresh adds values for the next one.
+    counts holds how many rows of the newest generation use each id; once enough ids are
+    unused, compacted() copies the live values into a fresh vocabulary and older snapshots
+    keep the old one until they are dropped. Posting lists are compact int32 arrays.
+    """
+    def __init__(self):
+        self.values = []
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._ids = {}
+        self._postings = defaultdict(lambda: array('i'))
+        self._lock = threading.Lock()
+        _vocabularies.add(self)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def ids_for(self, texts: List[str]) -> np.ndarray:
+        """Value id of each text, adding unseen texts to the index"""
+        ids = np.empty(len(texts), dtype=np.int32)
+        with self._lock:
+            for i, text in enumerate(texts):
+                value_id = self._ids.get(text)
+                if value_id is None:
+                    value_id = self._ids[text] = len(self.values)
+                    self.values.append(text)
+                    for gram in _ngrams(text):
+                        self._postings[gram].append(value_id)
+                ids[i] = value_id
+            if len(self.counts) < len(self.values):
+                self.counts = np.concatenate([self.counts, np.zeros(len(self.values) - len(self.counts), np.int64)])
+        return ids
+
+    def add_refs(self, ids: np.ndarray, sign: int = 1):
+        """Count rows using ids (ignoring -1 for missing values); sign=-1 releases them"""
+        ids = ids[ids >= 0]
+        if len(ids):
+            with self._lock:
+                self.counts[:len(self.values)] += sign * np.bincount(ids, minlength=len(self.values))
+
+    def unused(self) -> int:
+        """Number of ids no row of the newest generation refers to"""
+        with self._lock:
+            return int(np.count_nonzero(self.counts[:len(self.values)] == 0))
+
+    def compacted(self) -> Tuple['NgramVocabulary', np.ndarray]:
+        """New vocabulary holding only used values, and the old-id -> new-id remap (-1 for dropped ids)"""
+        with self._lock:
+            live = np.flatnonzero(self.counts[:len(self.values)] > 0)
+            texts = [self.values[value_id] for value_id in live]
+            counts = self.counts[live]
+        vocabulary = NgramVocabulary()
+        vocabulary.ids_for(texts)
+        vocabulary.counts = counts.copy()
+        remap = np.full(len(self.values), -1, dtype=np.int32)
+        remap[live] = np.arange(len(live), dtype=np.int32)
+        return vocabulary, remap
+
+    def matches(self, query: str, limit: int) -> np.ndarray:
+        """
+        Ids below limit of values containing query; posting lists give candidates, which are
+        then verified. limit is the vocabulary size an index was built with, so ids added
+        for later snapshots are never returned to it.
+        """
+        with self._lock:
+            grams = _ngrams(query)
+            if grams:
+                postings = sorted((self._postings.get(gram) for gram in grams), key=lambda p: len(p or ()))
+                if not postings[0]:
+                    return np.empty(0, dtype=np.int32)
+                candidates = np.array(postings[0], dtype=np.int32)
+                for posting in postings[1:]:
+                    candidates = np.intersect1d(candidates, np.array(posting, dtype=np.int32), assume_unique=True)
+                candidates = candidates[candidates < limit]
+            else:
+                candidates = np.arange(min(limit, len(self.values)), dtype=np.int32)
+            return np.array([value_id for value_id in candidates if query in self.values[value_id]], dtype=np.int32)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by values, counts and posting lists"""
+        with self._lock:
+            postings = sum(p.itemsize * len(p) for p in self._postings.values())
+            return postings + self.counts.nbytes + sum(len(v) for v in self.values)
+
+
+# Compact a vocabulary once at least this fraction of its values is unused
+VOCABULARY_COMPACT_FRACTION = 0.5
+
+
+def _lowered(values) -> List[str]:
+    return [str(value).lower() for value in values]
+
+
+class ColumnTextIndex:
+    """
+    One column of one snapshot: the vocabulary id of each row's value (-1 when missing)
+    and the vocabulary size when the mapping was built.
+    """
+    def __init__(self, vocabulary: NgramVocabulary, row_ids: np.ndarray):
+        self.vocabulary = vocabulary
+        self.row_ids = row_ids
+        self.size = len(vocabulary)
+
+    @classmethod
+    def build(cls, values: pd.Series) -> 'ColumnTextIndex':
+        """Index a column from scratch in a new vocabulary"""
+        vocabulary = NgramVocabulary()
+        row_ids = cls._assign_ids(vocabulary, values)
+        vocabulary.add_refs(row_ids)
+        return cls(vocabulary, row_ids)
+
+    @staticmethod
+    def _assign_ids(vocabulary: NgramVocabulary, values: pd.Series) -> np.ndarray:
+        # Only distinct values are lowercased and looked up; rows map to them by factorize codes
+        codes, uniques = pd.factorize(values)
+        unique_ids = vocabulary.ids_for(_lowered(uniques))
+        row_ids = np.full(len(codes), -1, dtype=np.int32)
+        present = codes >= 0
+        row_ids[present] = unique_ids[codes[present]]
+        return row_ids
+
+    def advance(self, values: pd.Series, source: np.ndarray) -> 'ColumnTextIndex':
+        """
+        Index of the next generation of this column, where source (see DataSnapshot.row_sources)
+        maps each row to an unchanged row of this one. Only new and changed rows are factorized;
+        the ids of rows that disappeared are released and the vocabulary is compacted once
+        VOCABULARY_COMPACT_FRACTION of it is unused.
+        """
+        vocabulary = self.vocabulary
+        carried = source >= 0
+        row_ids = np.full(len(source), -1, dtype=np.int32)
+        row_ids[carried] = self.row_ids[source[carried]]
+
+        released = np.ones(len(self.row_ids), dtype=bool)
+        released[source[carried]] = False
+        vocabulary.add_refs(self.row_ids[released], sign=-1)
+
+        fresh = np.flatnonzero(~carried)
+        if len(fresh):
+            fresh_ids = self._assign_ids(vocabulary, values.iloc[fresh])
+            row_ids[fresh] = fresh_ids
+            vocabulary.add_refs(fresh_ids)
+
+        if vocabulary.unused() > len(vocabulary) * VOCABULARY_COMPACT_FRACTION:
+            vocabulary, remap = vocabulary.compacted()
+            present = row_ids >= 0
+            row_ids[present] = remap[row_ids[present]]
+        return ColumnTextIndex(vocabulary, row_ids)
+
+    def matching_rows(self, query: str) -> np.ndarray:
+        """Boolean mask of the rows whose value contains the lowercased query"""
+        # The last slot stays False and absorbs the -1 ids of missing values
+        hit = np.zeros(self.size + 1, dtype=bool)
+        hit[self.vocabulary.matches(query, self.size)] = True
+        return hit[self.row_ids]
+
+
+# Newest (generation, ColumnTextIndex) per (table, column); the next generation advances from it
+_latest_columns = {}
+
+
+def _column_index(snapshot: DataSnapshot, table_key: str, column: str) -> ColumnTextIndex:
+    """Column index of a snapshot, carried forward from the previous generation when possible"""
+    cache_key = ('text_column', table_key, column)
+    index = snapshot.derived.get(cache_key)
+    if index is not None:
+        return index
+    values = snapshot[table_key][column]
+    latest = _latest_columns.get((table_key, column))
+    base = snapshot.row_sources.get(table_key)
+    if latest is not None and base is not None and latest[0] == base[0]:
+        index = latest[1] if base[1] is None else latest[1].advance(values, base[1])
+    else:
+        index = ColumnTextIndex.build(values)
+    if latest is None or snapshot.generation > latest[0]:
+        _latest_columns[(table_key, column)] = (snapshot.generation, index)
+    snapshot.derived[cache_key] = index
+    return index
+
+
+class TextIndex:
+    """Case-insensitive substring index over some columns of one snapshot's table"""
+    def __init__(self, row_count: int, columns: Dict[str, ColumnTextIndex]):
+        self.row_count = row_count
+        self.columns = columns
+
+    def search(self, query: str) -> np.ndarray:
+        """Sorted row positions where any indexed column contains query"""
+        query = query.lower()
+        mask = np.zeros(self.row_count, dtype=bool)
+        for column in self.columns.values():
+            mask |= column.matching_rows(query)
+        return np.flatnonzero(mask)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes used by the row mapping of this snapshot and by the vocabularies it refers to"""
+        return {
+            'row_ids': sum(column.row_ids.nbytes for column in self.columns.values()),
+            'vocabulary': sum(column.vocabulary.memory_usage() for column in self.columns.values())
+        }
+
+
+def _text_index_columns(df: pd.DataFrame, columns) -> List[str]:
+    if columns == 'text':
+        # Text-like columns only: timestamps and numbers would fill the vocabulary with unique values
+        return [col for col in df.columns
+                if pd.api.types.is_string_dtype(df[col].dtype) or isinstance(df[col].dtype, pd.CategoricalDtype)]
+    resolved = (resolve_column(df, name) for name in columns)
+    return [col for col in resolved if col is not None]
+
+
+def get_text_index(snapshot: DataSnapshot, table_key: str, columns=None) -> TextIndex:
+    """
+    Substring index of a table over columns, defaulting to its SEARCH_COLUMNS.
+    columns='text' indexes every text column. Built once per snapshot.
+    """
+    if columns is None:
+        columns = SEARCH_COLUMNS.get(table_key, [])
+    cache_key = ('text_index', table_key, columns if isinstance(columns, str) else tuple(columns))
+    index = snapshot.derived.get(cache_key)
+    if index is None:
+        with _build_lock:
+            index = snapshot.derived.get(cache_key)
+            if index is None:
+                df = snapshot[table_key]
+                index = snapshot.derived[cache_key] = TextIndex(
+                    len(df), {col: _column_index(snapshot, table_key, col) for col in _text_index_columns(df, columns)})
+    return index
+
+
+def search_text(snapshot: DataSnapshot, table_key: str, query: str, columns=None) -> np.ndarray:
+    """Row positions of a table matching query as a case-insensitive substring"""
+    return get_text_index(snapshot, table_key, columns).search(query)
+
+
+class SearchResultCache:
+    """
+    LRU of free-text match positions keyed by (generation, table, query, columns), bounded
+    by entry count and by the bytes of the cached position arrays.
+
+    Keying on the data generation means a refresh never serves stale matches; entries of
+    older generations are dropped when a new snapshot is published. Results larger than
+    max_result_bytes (e.g. a one-letter query over events) are returned but not cached.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024,
+                 max_result_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return positions
+            self.misses += 1
+
+        positions = compute()
+        positions.setflags(write=False)
+        if positions.nbytes > self.max_result_bytes:
+            return positions
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._entries[key] = positions
+            self.nbytes += positions.nbytes
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return positions
+
+    def evict_before(self, generation: int):
+        """Drop entries computed against generations older than generation"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] < generation]:
+                self.nbytes -= self._entries.pop(key).nbytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+RESULT_CACHE = SearchResultCache()
+
+# Computes uncached free-text matches; search_executor can swap in a process-pool backend
+_text_search_backend = None
+
+
+def set_text_search_backend(backend: Optional[Callable]):
+    """Use backend(snapshot, table_key, query, columns) for uncached searches, or None for search_text"""
+    global _text_search_backend
+    _text_search_backend = backend
+
+
+def cached_search_text(snapshot: DataSnapshot, table_key: str, query: str, columns=None) -> np.ndarray:
+    """search_text through RESULT_CACHE, so paging through a query only searches once"""
+    key = (snapshot.generation, table_key, query.lower(),
+           columns if columns is None or isinstance(columns, str) else tuple(columns))
+    backend = _text_search_backend or search_text
+    return RESULT_CACHE.get_or_compute(key, lambda: backend(snapshot, table_key, query, columns))
+
+
+def evict_stale_results(snapshot: DataSnapshot):
+    RESULT_CACHE.evict_before(snapshot.generation)
+
+
+def encode_cursor(query: str, query_type: Optional[str], offset: int, limit: int) -> str:
+    """Opaque continuation token for the next page of a search"""
+    payload = json.dumps({"q": query, "t": query_type, "o": offset, "l": limit}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, query: str, query_type: Optional[str],
+                  max_limit: int = MAX_PAGE_SIZE) -> Tuple[int, int]:
+    """Return (offset, limit) from a token, raising ValueError if it is malformed, for another search or over max_limit"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset, limit = int(payload["o"]), int(payload["l"])
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError("Malformed cursor")
+    if payload.get("q") != query or payload.get("t") != query_type:
+        raise ValueError("Cursor belongs to a different search")
+    if offset < 0 or not 1 <= limit <= max_limit:
+        raise ValueError("Malformed cursor")
+    return offset, limit
+
+
+def build_text_indexes(snapshot: DataSnapshot):
+    """Build the TEXT_INDEXES of every table in the snapshot and report their size"""
+    for table_key, columns in TEXT_INDEXES:
+        if snapshot.get(table_key) is None:
+            continue
+        usage = get_text_index(snapshot, table_key, columns).memory_usage()
+        print(f"Text index for {table_key}: rows {usage['row_ids'] / 1024 / 1024:.1f} MB, "
+              f"vocabulary {usage['vocabulary'] / 1024 / 1024:.1f} MB")
+
+
+# Newest ID index per table as (generation, IdIndex), reused by snapshots whose table is unchanged
+_latest_id_indexes = {}
+
+
+def build_id_indexes(snapshot: DataSnapshot):
+    """Build the ID indexes of every table in the snapshot, reusing the previous one of unchanged tables"""
+    for table_key, name in ID_COLUMNS.items():
+        df = snapshot.get(table_key)
+        if df is None:
+            continue
+        column = resolve_column(df, name)
+        if column is None:
+            continue
+        latest = _latest_id_indexes.get(table_key)
+        base = snapshot.row_sources.get(table_key)
+        if (latest is not None and base is not None and base[1] is None and latest[0] == base[0]
+                and latest[1].column == column):
+            index = latest[1]
+        else:
+            index = IdIndex(df, column)
+        if latest is None or snapshot.generation > latest[0]:
+            _latest_id_indexes[table_key] = (snapshot.generation, index)
+        snapshot.derived[('id_index', table_key)] = index
+
+
+def get_id_index(snapshot: DataSnapshot, table_key: str) -> Optional[IdIndex]:
+    """ID index of a table, built on first use if the snapshot was published without one"""
+    index = snapshot.derived.get(('id_index', table_key))
+    if index is None and table_key in ID_COLUMNS:
+        with _build_lock:
+            index = snapshot.derived.get(('id_index', table_key))
+            df = snapshot.get(table_key)
+            column = resolve_column(df, ID_COLUMNS[table_key]) if df is not None else None
+            if index is None and column is not None:
+                index = snapshot.derived[('id_index', table_key)] = IdIndex(df, column)
+    return index
+
+
+def lookup_rows(snapshot: DataSnapshot, table_key: str, key) -> pd.DataFrame:
+    """Rows of a table whose ID column equals key, using the snapshot's hash index"""
+    df = snapshot[table_key]
+    index = get_id_index(snapshot, table_key)
+    if index is None:
+        return df.iloc[:0]
+    return df.iloc[index.lookup(key)]
+
+
+def _reset_locks_in_child():
+    """A forked child inherits the locks other parent threads held at fork time; replace them"""
+    global _build_lock
+    _build_lock = threading.Lock()
+    for vocabulary in list(_vocabularies):
+        vocabulary._lock = threading.Lock()
+    RESULT_CACHE._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_in_child)
+
+add_publish_listener(build_id_indexes)
+add_publish_listener(build_text_indexes)
+add_publish_listener(evict_stale_results)
@@ -0,0 +1,104 @@
+import json
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+RESPONSE_FORMATS = ['records', 'columnar']
+
+STREAM_BATCH_SIZE = 1000
+
+
+def _default(value):
+    """Encode the pandas and numpy values neither json nor orjson handle on their own"""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Serialize content to JSON bytes with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through dumps instead of the stdlib encoder"""
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def _string_values(values: pd.Series) -> pd.Series:
+    """str() of every value with nulls as "None", whatever the dtype's own missing marker (<NA>, nan, NaT)"""
+    return values.astype(str).astype(object).where(values.notna().to_numpy(), 'None')
+
+
+def frame_to_records(df: pd.DataFrame, columns: List[str], as_strings: bool = True) -> List[Dict]:
+    """
+    Rows of df as dicts, limited to columns. Only the given rows and columns are converted,
+    so callers should slice to the page first. as_strings keeps the str() values the API returns.
+    """
+    subset = df[columns]
+    if as_strings:
+        subset = subset.apply(_string_values)
+    return subset.to_dict(orient="records")
+
+
+def frame_to_columns(df: pd.DataFrame, columns: List[str], as_strings: bool = True) -> Dict:
+    """Columnar shape {"columns": [...], "rows": n, "data": {column: [values]}} of the given rows"""
+    data = {}
+    for col in columns:
+        values = df[col]
+        data[col] = _string_values(values).tolist() if as_strings else values.tolist()
+    return {"columns": list(columns), "rows": len(df), "data": data}
+
+
+def serialize_frame(df: pd.DataFrame, columns: List[str], response_format: str = 'records',
+                    as_strings: bool = True):
+    """Serialize the selected rows and columns in one of RESPONSE_FORMATS"""
+    if response_format == 'columnar':
+        return frame_to_columns(df, columns, as_strings)
+    return frame_to_records(df, columns, as_strings)
+
+
+def ndjson_stream(header: Dict, sources: Sequence[Tuple[str, pd.DataFrame, np.ndarray, List[str]]],
+                  batch_size: int = STREAM_BATCH_SIZE, as_strings: bool = True) -> Iterator[bytes]:
+    """
+    Yield newline-delimited JSON: a metadata line, one line per row, then a summary trailer.
+
+    Each source is (list name, frame, row positions, output columns). Rows are converted
+    batch_size at a time straight from the positions, so memory stays flat however many match.
+    """
+    yield dumps({"type": "metadata", **header}) + b"\n"
+    totals = {}
+    for name, df, positions, columns in sources:
+        for start in range(0, len(positions), batch_size):
+            batch = df.iloc[positions[start:start + batch_size]]
+            records = frame_to_records(batch, columns, as_strings)
+            yield b"".join(dumps({"type": "row", "list": name, "data": record}) + b"\n" for record in records)
+        totals[name] = len(positions)
+    yield dumps({"type": "summary", "totals": totals, "total_matches": sum(totals.values())}) + b"\n"
+
+
+def ndjson_response(header: Dict, sources: Sequence[Tuple[str, pd.DataFrame, np.ndarray, List[str]]],
+                    as_strings: bool = True) -> StreamingResponse:
+    """StreamingResponse over ndjson_stream"""
+    return StreamingResponse(ndjson_stream(header, sources, as_strings=as_strings),
+                             media_type="application/x-ndjson")
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app import WATERMARK_OVERLAP, PeriodicDataLoader
+
+
+class OverlapLoader(PeriodicDataLoader):
+    """Serves a fixed CI table, filtered by the incremental lower bound like the real query"""
+    def __init__(self, table: pd.DataFrame):
+        super().__init__(pool=object())
+        self.table = table
+
+    def _fetch_table(self, table_name, last_update):
+        rows = self.table
+        if last_update is not None:
+            rows = rows[rows['PFZ_ADDED_TIME'] >= pd.Timestamp(last_update.astimezone().replace(tzinfo=None))]
+        return rows.reset_index(drop=True), 0.0
+
+
+def test_unchanged_table_is_not_republished():
+    now = datetime.now().replace(microsecond=0)
+    table = pd.DataFrame({
+        'LOGICAL_NAME': ['ci-1', 'ci-2'],
+        'ISTATUS': ['Live', 'Live'],
+        'PFZ_ADDED_TIME': [now - timedelta(days=1), now - WATERMARK_OVERLAP / 2]
+    })
+    loader = OverlapLoader(table)
+    loader.update_data(['ci'])
+    assert loader.generation == 1
+    for _ in range(2):
+        loader.update_data(['ci'])
+    assert loader.generation == 1
+    assert loader.table_delta_rows['ci'] == 0
+
+    loader.table.loc[1, 'ISTATUS'] = 'Maintenance'
+    loader.update_data(['ci'])
+    assert loader.generation == 2
+    assert loader.table_delta_rows['ci'] == 1
+    assert loader.snapshot()['ci']['ISTATUS'].tolist() == ['Live', 'Maintenance']
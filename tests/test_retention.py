@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app import retention_mask
+
+NOW = datetime(2024, 3, 10, 12, 0, 0)
+
+
+def frame(days_old, opened_days_old=None):
+    data = {'ts': [NOW - timedelta(days=days) if days is not None else None for days in days_old]}
+    if opened_days_old is not None:
+        data['opened'] = [NOW - timedelta(days=days) for days in opened_days_old]
+    return pd.DataFrame(data)
+
+
+def test_rows_older_than_the_window_are_dropped():
+    keep = retention_mask(frame([1, 8, 3, 10]), 'ts', window=timedelta(days=7), now=NOW)
+    assert keep.tolist() == [True, False, True, False]
+
+
+def test_nothing_to_evict_returns_none():
+    assert retention_mask(frame([1, 2]), 'ts', window=timedelta(days=7), max_rows=5, now=NOW) is None
+    assert retention_mask(frame([1, 2]), 'missing', window=timedelta(days=7), now=NOW) is None
+
+
+def test_max_rows_keeps_the_newest_and_drops_undated_first():
+    keep = retention_mask(frame([5, None, 1, 3]), 'ts', max_rows=2, now=NOW)
+    assert keep.tolist() == [False, False, True, True]
+
+
+def test_max_rows_ranks_by_rank_column():
+    df = frame([1, 2, 3], opened_days_old=[30, 10, 20])
+    keep = retention_mask(df, 'ts', window=timedelta(days=7), max_rows=2, now=NOW, rank_column='opened')
+    assert keep.tolist() == [False, True, True]
+
+
+def test_window_applies_to_timezone_aware_columns():
+    df = frame([1, 8])
+    df['ts'] = df['ts'].dt.tz_localize('UTC')
+    keep = retention_mask(df, 'ts', window=timedelta(days=7), now=NOW)
+    assert keep.tolist() == [True, False]
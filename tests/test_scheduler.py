@@ -0,0 +1,61 @@
+import time
+
+import app
+from app import REFRESH_BACKOFF, REFRESH_BUSY_ROWS, REFRESH_COST_FACTOR, RefreshSchedule
+
+
+def schedule(monkeypatch, initial=300):
+    monkeypatch.setattr(app, 'REFRESH_JITTER', 0.0)
+    monkeypatch.setattr(app, 'DB_PEAK_HOURS', set())
+    return RefreshSchedule(60, initial, 900)
+
+
+def test_busy_delta_halves_the_interval(monkeypatch):
+    refresh = schedule(monkeypatch)
+    refresh.record(time.monotonic(), REFRESH_BUSY_ROWS, 1.0)
+    assert refresh.interval == 150
+
+
+def test_empty_delta_backs_off_up_to_the_maximum(monkeypatch):
+    refresh = schedule(monkeypatch)
+    refresh.record(time.monotonic(), 0, 1.0)
+    assert refresh.interval == 300 * REFRESH_BACKOFF
+    for _ in range(10):
+        refresh.record(time.monotonic(), 0, 1.0)
+    assert refresh.interval == 900
+
+
+def test_interval_covers_the_refresh_cost(monkeypatch):
+    refresh = schedule(monkeypatch)
+    refresh.record(time.monotonic(), REFRESH_BUSY_ROWS, 20.0)
+    assert refresh.interval == 20.0 * REFRESH_COST_FACTOR
+
+
+def test_full_load_keeps_the_interval(monkeypatch):
+    refresh = schedule(monkeypatch)
+    refresh.record(time.monotonic(), None, 1.0)
+    assert refresh.interval == 300
+
+
+def test_next_run_is_due_one_interval_after_the_start(monkeypatch):
+    refresh = schedule(monkeypatch)
+    started = time.monotonic()
+    refresh.record(started, 5, 1.0)
+    assert refresh.next_due == started + 300
+    assert not refresh.due(started + 299)
+    assert refresh.due(started + 300)
+
+
+def test_failure_retries_after_the_minimum_without_changing_the_interval(monkeypatch):
+    refresh = schedule(monkeypatch)
+    started = time.monotonic()
+    refresh.record(started, None, 1.0, failed=True)
+    assert refresh.interval == 300
+    assert started + 60 <= refresh.next_due <= time.monotonic() + 60
+
+
+def test_slow_failure_waits_from_when_it_ended(monkeypatch):
+    refresh = schedule(monkeypatch)
+    started = time.monotonic() - 120  # The failing refresh ran longer than min_seconds
+    refresh.record(started, None, 120.0, failed=True)
+    assert refresh.next_due >= time.monotonic() + 59
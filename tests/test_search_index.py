@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import DataSnapshot
+from search_index import (MAX_PAGE_SIZE, ColumnTextIndex, NgramVocabulary, SearchResultCache, build_id_indexes,
+                          decode_cursor, encode_cursor, get_id_index, get_text_index, search_text)
+
+
+def snapshot_of(generation, df, base=None):
+    row_sources = {'ci': base} if base is not None else None
+    return DataSnapshot(generation, {'ci': df}, row_sources=row_sources)
+
+
+def test_search_matches_substrings_case_insensitively():
+    df = pd.DataFrame({'col5': ['Web-Server-01', 'db-server-02', None], 'col6': ['owner a', 'owner b', 'SERVER room']})
+    snapshot = snapshot_of(1, df)
+    assert search_text(snapshot, 'ci', 'server').tolist() == [0, 1, 2]
+    assert search_text(snapshot, 'ci', 'WEB').tolist() == [0]
+    assert search_text(snapshot, 'ci', 'missing').tolist() == []
+
+
+def test_values_added_after_build_do_not_leak_into_older_index():
+    index = ColumnTextIndex.build(pd.Series(['alpha', None, 'beta']))
+    # A refresh adds values for the next generation while this index is still served
+    index.vocabulary.ids_for(['gamma', 'delta', 'alphabet'])
+    assert np.flatnonzero(index.matching_rows('alpha')).tolist() == [0]
+    assert np.flatnonzero(index.matching_rows('a')).tolist() == [0, 2]
+
+
+def test_advance_carries_unchanged_rows_and_indexes_new_ones():
+    first = ColumnTextIndex.build(pd.Series(['alpha', 'beta', 'gamma']))
+    # Row 1 was updated, row 2 evicted and a row appended
+    values = pd.Series(['alpha', 'bravo', 'delta'])
+    second = first.advance(values, np.array([0, -1, -1]))
+    assert np.flatnonzero(second.matching_rows('bravo')).tolist() == [1]
+    assert np.flatnonzero(second.matching_rows('delta')).tolist() == [2]
+    assert np.flatnonzero(second.matching_rows('gamma')).tolist() == []
+    # The previous generation still answers from its own rows
+    assert np.flatnonzero(first.matching_rows('gamma')).tolist() == [2]
+
+
+def test_advance_compacts_the_vocabulary_once_values_are_unused():
+    index = ColumnTextIndex.build(pd.Series([f'value {i}' for i in range(10)]))
+    for generation in range(5):
+        values = pd.Series([f'value {generation}-{i}' for i in range(10)])
+        index = index.advance(values, np.full(10, -1))
+    assert len(index.vocabulary) <= 20
+    assert np.flatnonzero(index.matching_rows('value 4-3')).tolist() == [3]
+
+
+def test_unchanged_table_reuses_the_previous_columns():
+    df = pd.DataFrame({'col5': ['a1', 'b2'], 'col6': ['x', 'y']})
+    first = snapshot_of(10, df)
+    get_text_index(first, 'ci')
+    second = snapshot_of(11, df, base=(10, None))
+    assert get_text_index(second, 'ci').columns['col5'] is get_text_index(first, 'ci').columns['col5']
+
+
+def test_unchanged_table_reuses_the_previous_id_index():
+    df = pd.DataFrame({'LOGICAL_NAME': ['ci-1', 'ci-2'], 'col5': ['a', 'b']})
+    first = snapshot_of(30, df)
+    build_id_indexes(first)
+    second = snapshot_of(31, df, base=(30, None))
+    build_id_indexes(second)
+    assert get_id_index(second, 'ci') is get_id_index(first, 'ci')
+    changed = snapshot_of(32, df.iloc[::-1].reset_index(drop=True), base=(31, np.array([1, 0])))
+    build_id_indexes(changed)
+    assert get_id_index(changed, 'ci') is not get_id_index(second, 'ci')
+    assert get_id_index(changed, 'ci').lookup('ci-2').tolist() == [0]
+
+
+def test_text_columns_skip_timestamps():
+    df = pd.DataFrame({'col5': ['a'], 'added': pd.to_datetime(['2024-01-01']), 'count': [3]})
+    index = get_text_index(snapshot_of(20, df), 'ci', 'text')
+    assert list(index.columns) == ['col5']
+
+
+def test_vocabulary_counts_follow_references():
+    vocabulary = NgramVocabulary()
+    ids = vocabulary.ids_for(['one', 'two', 'one'])
+    vocabulary.add_refs(ids)
+    vocabulary.add_refs(ids[:1], sign=-1)
+    assert vocabulary.counts.tolist() == [1, 1]
+    assert vocabulary.unused() == 0
+
+
+def test_cursor_round_trips_for_the_same_search():
+    cursor = encode_cursor('srv01', 'ci', 200, 100)
+    assert decode_cursor(cursor, 'srv01', 'ci') == (200, 100)
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor('srv01', 'ci', -1, 100),
+                                    encode_cursor('srv01', 'ci', 0, 0),
+                                    encode_cursor('srv01', 'ci', 0, MAX_PAGE_SIZE + 1)])
+def test_cursor_rejects_malformed_tokens_and_oversized_pages(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'srv01', 'ci')
+
+
+def test_cursor_rejects_another_search():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor('srv01', 'ci', 0, 100), 'srv02', 'ci')
+
+
+def test_result_cache_is_bounded_by_bytes_and_skips_large_results():
+    cache = SearchResultCache(max_entries=10, max_bytes=2000, max_result_bytes=1000)
+    for key in range(3):
+        cache.get_or_compute((1, key), lambda: np.arange(100))
+    assert cache.stats()['entries'] == 2
+    assert cache.nbytes == 1600
+    large = cache.get_or_compute((1, 'large'), lambda: np.arange(1000))
+    assert len(large) == 1000
+    assert (1, 'large') not in cache._entries
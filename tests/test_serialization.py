@@ -0,0 +1,24 @@
+import pandas as pd
+
+from serialization import frame_to_columns, frame_to_records
+
+
+def typed_frame():
+    return pd.DataFrame({
+        'text': pd.Series(['a', None], dtype='string[pyarrow]'),
+        'status': pd.Series(['Open', None], dtype='category'),
+        'count': pd.Series([3, None], dtype='Int64'),
+        'opened': pd.to_datetime(['2024-01-01 10:00', None]),
+        'raw': pd.Series(['x', None], dtype=object)
+    })
+
+
+def test_records_render_nulls_as_none_for_every_dtype():
+    records = frame_to_records(typed_frame(), ['text', 'status', 'count', 'opened', 'raw'])
+    assert records[0] == {'text': 'a', 'status': 'Open', 'count': '3', 'opened': '2024-01-01 10:00:00', 'raw': 'x'}
+    assert records[1] == {'text': 'None', 'status': 'None', 'count': 'None', 'opened': 'None', 'raw': 'None'}
+
+
+def test_columns_render_nulls_as_none():
+    data = frame_to_columns(typed_frame(), ['status', 'count'])['data']
+    assert data == {'status': ['Open', 'None'], 'count': ['3', 'None']}
@@ -0,0 +1,32 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app import DataSnapshot, load_snapshot, save_snapshot
+
+pytest.importorskip('pyarrow')
+
+
+def saved_path(directory, key):
+    with open(os.path.join(directory, 'CURRENT')) as f:
+        return os.path.join(directory, f.read().strip(), f"{key}.arrow")
+
+
+def test_save_rewrites_only_changed_tables(tmp_path):
+    directory = str(tmp_path)
+    frames = {'a': pd.DataFrame({'id': [1, 2]}),
+              'b': pd.DataFrame({'id': [3], 'name': pd.Series(['x'], dtype='string[pyarrow]')})}
+    save_snapshot(DataSnapshot(1, frames), directory, None)
+    b_inode = os.stat(saved_path(directory, 'b')).st_ino
+
+    frames = {'a': pd.DataFrame({'id': [1, 2, 4]}), 'b': frames['b']}
+    save_snapshot(DataSnapshot(2, frames), directory, None, changed={'a'})
+    assert os.stat(saved_path(directory, 'b')).st_ino == b_inode
+    assert len([entry for entry in os.listdir(directory) if entry.startswith('gen-')]) == 1
+
+    loaded, manifest = load_snapshot(directory)
+    assert manifest['generation'] == 2
+    assert loaded['a']['id'].tolist() == [1, 2, 4]
+    assert loaded['b']['id'].tolist() == [3]
+    assert loaded['b']['name'].dtype == 'string[pyarrow]'
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from app import KeyIndex, upsert_dataframe
+
+
+def frame(ids, values, status=None):
+    data = {'id': ids, 'value': values}
+    if status is not None:
+        data['status'] = status
+    return pd.DataFrame(data)
+
+
+def test_update_overwrites_matching_keys_in_place():
+    existing = frame([1, 2, 3], ['a', 'b', 'c'])
+    merged, key_index, _, _ = upsert_dataframe(existing, frame([2], ['B']), 'id')
+    assert merged['id'].tolist() == [1, 2, 3]
+    assert merged['value'].tolist() == ['a', 'B', 'c']
+    assert len(key_index) == 3
+
+
+def test_append_adds_new_keys_at_the_end():
+    existing = frame([1, 2], ['a', 'b'])
+    merged, key_index, _, _ = upsert_dataframe(existing, frame([3, 1], ['c', 'A']), 'id')
+    assert merged['id'].tolist() == [1, 2, 3]
+    assert merged['value'].tolist() == ['A', 'b', 'c']
+    assert key_index.get_indexer([3, 1, 9]).tolist() == [2, 0, -1]
+
+
+def test_tombstone_drops_existing_rows_and_skips_new_ones():
+    existing = frame([1, 2, 3], ['a', 'b', 'c'], ['Live', 'Live', 'Live'])
+    delta = frame([2, 4, 5], ['b', 'd', 'e'], ['Retired', 'Retired', 'Live'])
+    merged, key_index, _, _ = upsert_dataframe(existing, delta, 'id', tombstone=('status', ('Retired',)))
+    assert merged['id'].tolist() == [1, 3, 5]
+    assert key_index.get_indexer([1, 3, 5, 2]).tolist() == [0, 1, 2, -1]
+
+
+def test_copy_leaves_existing_untouched():
+    existing = frame([1, 2], ['a', 'b'])
+    merged, _, _, _ = upsert_dataframe(existing, frame([1], ['A']), 'id', copy=True)
+    assert existing['value'].tolist() == ['a', 'b']
+    assert merged['value'].tolist() == ['A', 'b']
+
+
+def test_latest_duplicate_in_delta_wins():
+    existing = frame([1], ['a'])
+    delta = pd.DataFrame({'id': [1, 1], 'value': ['new', 'old'], 'ts': [2, 1]})
+    merged, _, _, _ = upsert_dataframe(existing, delta, 'id', order_column='ts')
+    assert merged.loc[0, 'value'] == 'new'
+
+
+def test_merge_keeps_the_input_order():
+    # A first load is merged into an empty frame and must keep the query's ORDER BY
+    delta = pd.DataFrame({'id': [3, 1, 2, 1], 'value': ['c', 'a-new', 'b', 'a-old'], 'ts': [1, 5, 9, 2]})
+    merged, _, _, _ = upsert_dataframe(delta.iloc[:0], delta, 'id', order_column='ts')
+    assert merged['id'].tolist() == [3, 1, 2]
+    assert merged['value'].tolist() == ['c', 'a-new', 'b']
+
+
+def test_key_index_is_carried_across_cycles():
+    merged, key_index, _, _ = upsert_dataframe(frame([], []), frame([1, 2], ['a', 'b']), 'id')
+    for key in range(3, 40):
+        merged, key_index, _, _ = upsert_dataframe(merged, frame([key, 1], [str(key), 'x']), 'id', key_index=key_index)
+    assert len(merged) == 39
+    assert key_index.get_indexer(merged['id']).tolist() == list(range(39))
+    assert merged.loc[0, 'value'] == 'x'
+
+
+def test_key_index_append_keeps_few_segments():
+    key_index = KeyIndex.from_keys(np.arange(1000))
+    for start in range(1000, 2000, 10):
+        key_index = key_index.append(np.arange(start, start + 10))
+    assert len(key_index) == 2000
+    assert key_index.segment_count <= 8
+    assert key_index.get_indexer([0, 1500, 1999, 2000]).tolist() == [0, 1500, 1999, -1]
+
+
+def test_source_maps_unchanged_rows_to_existing_positions():
+    existing = frame([1, 2, 3, 4], ['a', 'b', 'c', 'd'], ['Live'] * 4)
+    delta = frame([2, 3, 5], ['B', 'c', 'e'], ['Live', 'Retired', 'Live'])
+    merged, _, source, changed_rows = upsert_dataframe(existing, delta, 'id', tombstone=('status', ('Retired',)))
+    assert merged['id'].tolist() == [1, 2, 4, 5]
+    assert source.tolist() == [0, -1, 3, -1]
+    assert changed_rows == 3
+
+
+def test_rows_re_read_unchanged_are_skipped():
+    existing = pd.DataFrame({
+        'id': [1, 2],
+        'value': pd.Series(['a', None], dtype='string[pyarrow]'),
+        'kind': pd.Series(['x', 'y'], dtype='category'),
+        'count': pd.Series([1, None], dtype='Int64')
+    })
+    delta = existing.iloc[::-1].reset_index(drop=True)
+    delta['kind'] = delta['kind'].astype(object)
+    merged, _, source, changed_rows = upsert_dataframe(existing, delta, 'id', copy=True)
+    assert merged is existing
+    assert source.tolist() == [0, 1]
+    assert changed_rows == 0
+
+
+def test_only_rows_that_differ_are_updated():
+    existing = frame([1, 2, 3], ['a', 'b', 'c'])
+    merged, _, source, changed_rows = upsert_dataframe(existing, frame([1, 2], ['a', 'B']), 'id', copy=True)
+    assert merged['value'].tolist() == ['a', 'B', 'c']
+    assert source.tolist() == [0, -1, 2]
+    assert changed_rows == 1
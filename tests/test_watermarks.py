@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+
+from app import timestamp_literal, to_utc
+
+
+def test_naive_and_aware_watermarks_compare_after_normalizing():
+    naive_local = datetime(2024, 3, 1, 12, 0, 0)
+    aware = to_utc(naive_local) + timedelta(seconds=1)
+    assert to_utc(naive_local) < aware
+    assert to_utc(aware) == aware
+
+
+def test_literal_round_trips_naive_local_columns():
+    naive_local = datetime(2024, 3, 1, 12, 0, 0)
+    assert timestamp_literal(to_utc(naive_local), 'timestamp without time zone') == '2024-03-01 12:00:00'
+
+
+def test_literal_keeps_the_offset_for_aware_columns():
+    value = datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert timestamp_literal(value, 'timestamp with time zone') == '2024-03-01 12:00:00+00:00'
@@ -1,8 +1,25 @@
+from app import get_snapshot, require_tables
+from search_index import lookup_rows, search_text
+from serialization import FastJSONResponse, ndjson_response
+
+
 @app.get(path="/api/UniversalSearch", tags=['search_data'])
-def universal_search(query: str = Query(..., description="Universal search across Incidents, Events, and CI records")):
+def universal_search(
+    query: str = Query(..., description="Universal search across Incidents, Events, and CI records"),
+    stream: bool = Query(default=False, description="Stream CI matches as NDJSON instead of one JSON body")
+):
     if not query:
         raise HTTPException(status_code=400, detail="No search query provided")
     
+    snapshot = get_snapshot()
+    if query.upper().startswith('IM'):
+        require_tables(snapshot, ['incidents'])
+    elif query[0].isdigit():
+        require_tables(snapshot, ['events'])
+    else:
+        require_tables(snapshot, ['ci'])
+    ci_df = snapshot.get('ci')
+    
     try:
         # Function to determine search type based on input pattern
         def determine_search_type(search_query):
@@ -23,38 +40,31 @@ def universal_search(query: str = Query(..., description="Universal search acros
         
         # Handle different search types
         if search_type == 'incident':
-            df = incidents_df.copy(deep=True)
-            # Convert timestamp columns to string before converting to dict
-            for col in df.select_dtypes(include=['datetime64[ns]']).columns:
-                df[col] = df[col].astype(str)
-            
-            filtered_df = df[df["NUMBERPRGN"] == query]
+            filtered_df = lookup_rows(snapshot, 'incidents', query).copy()
             if filtered_df.empty:
                 raise HTTPException(status_code=404, detail="Incident not found")
+            # Convert timestamp columns to string before converting to dict
+            for col in filtered_df.select_dtypes(include=['datetime64[ns]']).columns:
+                filtered_df[col] = filtered_df[col].astype(str)
             result = filtered_df.to_dict(orient="records")[0]
             
         elif search_type == 'event':
-            df = events_df.copy(deep=True)
-            # Convert timestamp columns to string before converting to dict
-            for col in df.select_dtypes(include=['datetime64[ns]']).columns:
-                df[col] = df[col].astype(str)
-                
-            filtered_df = df[df["EVENT_ID"] == query]
+            filtered_df = lookup_rows(snapshot, 'events', query).copy()
             if filtered_df.empty:
                 raise HTTPException(status_code=404, detail="Event not found")
+            # Convert timestamp columns to string before converting to dict
+            for col in filtered_df.select_dtypes(include=['datetime64[ns]']).columns:
+                filtered_df[col] = filtered_df[col].astype(str)
             result = filtered_df.to_dict(orient="records")[0]
             
         else:  # CI search
-            df = ci_df.copy(deep=True)
-            # Convert timestamp columns to string before converting to dict
-            for col in df.select_dtypes(include=['datetime64[ns]']).columns:
-                df[col] = df[col].astype(str)
-                
-            df = df.astype(str)
-            matched_records = df[df.apply(lambda row: row.astype(str).str.contains(query, case=False).any(), axis=1)]
-            if matched_records.empty:
+            # Substring match on any text column, answered from the n-gram index built on publish
+            positions = search_text(snapshot, 'ci', query, columns='text')
+            if len(positions) == 0:
                 raise HTTPException(status_code=404, detail="No CI records found")
-            result = matched_records.to_dict(orient="records")
+            if stream:
+                return ndjson_response(search_metadata, [("CI List", ci_df, positions, list(ci_df.columns))])
+            result = ci_df.iloc[positions].astype(str).to_dict(orient="records")
         
         response_data = {
             "metadata": search_metadata,
@@ -62,7 +72,7 @@ def universal_search(query: str = Query(..., description="Universal search acros
             "total_matches": 1 if search_type in ['incident', 'event'] else len(result)
         }
         
-        return JSONResponse(content=response_data)
+        return FastJSONResponse(content=response_data)
     
     except HTTPException:
         raise
@@ -74,4 +84,4 @@ def universal_search(query: str = Query(..., description="Universal search acros
             "search_query": query,
             "detected_type": determine_search_type(query)
         }
-        return JSONResponse(content=error_response, status_code=400)
+        return FastJSONResponse(content=error_response, status_code=400)